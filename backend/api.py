@@ -0,0 +1,601 @@
+import json
+from datetime import date
+from decimal import Decimal
+from functools import wraps
+import orjson
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask.json.provider import JSONProvider
+from werkzeug.test import EnvironBuilder
+from db import get_cursor, pinned_connection
+from auth import (
+    register_user,
+    verify_email_token,
+    resend_verification,
+    login_user,
+    login_or_register_google,
+    get_current_user_id,
+    get_current_user_admin,
+    is_admin_token,
+)
+from inventory import OutOfStock, hold_cart, held_quantity, set_order_cancelled
+from orders import place_order
+from telegram_service import send_telegram_notification
+import catalog
+import discount_engine
+import order_events
+import recommendations
+import reconciliation
+import scheduler
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+ORDER_STATUSES = ('pending', 'paid', 'shipped', 'delivered', 'cancelled')
+BATCH_MAX_CALLS = 10
+BATCH_FORWARDED_HEADERS = ('Authorization', 'X-Cart-Session')
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS  # int keys, e.g. per-product counts, like the stdlib encoder
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, date):  # datetimes too, when the stdlib encoder is used
+        return obj.isoformat()
+    return str(obj)  # timedelta, UUID, ...
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (Decimal as float, datetimes as ISO 8601)."""
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # indent, sort_keys, ...: orjson has no equivalent for most, use the stdlib encoder.
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS),
+                                        mimetype='application/json')
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not get_current_user_admin():
+            return jsonify({'error': 'Non autorisé'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def requested_fields():
+    """Sparse fieldset from `?fields=id,name,price`, or None for every field."""
+    fields = {f.strip() for f in request.args.get('fields', '').split(',') if f.strip()}
+    return fields or None
+
+def sparse(data, fields):
+    if not fields:
+        return data
+    if isinstance(data, list):
+        return [{k: v for k, v in row.items() if k in fields} for row in data]
+    return {k: v for k, v in data.items() if k in fields}
+
+def document_response(doc):
+    """Send a pre-serialized catalog document as-is, honouring If-None-Match and `fields=`."""
+    body, etag = doc
+    fields = requested_fields()
+    if fields:
+        return jsonify(sparse(orjson.loads(body), fields))
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+def event_stream_response():
+    """Live order events (new orders, status changes) as Server-Sent Events."""
+    return Response(
+        order_events.stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+def cart_owner():
+    """Return ('user_id', id) for a logged-in user, ('session_id', sid) for a guest, or (None, None)."""
+    user_id = get_current_user_id()
+    if user_id:
+        return 'user_id', user_id
+    data = request.get_json(silent=True) or {}
+    session_id = request.headers.get('X-Cart-Session') or data.get('cart_session')
+    if session_id:
+        return 'session_id', session_id
+    return None, None
+
+# ---------- Auth ----------
+@api.route('/auth/register', methods=['POST'])
+def auth_register():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip()
+    password = data.get('password') or ''
+    if not email or not password:
+        return jsonify({'error': 'Email et mot de passe requis'}), 400
+    user_id, err = register_user(email, password, (data.get('full_name') or '').strip(), data.get('lang', 'fr'))
+    if err:
+        return jsonify({'error': err}), 400
+    return jsonify({'message': 'Inscription réussie! Vérifiez votre email.', 'user_id': user_id}), 201
+
+@api.route('/auth/login', methods=['POST'])
+def auth_login():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip()
+    password = data.get('password') or ''
+    if not email or not password:
+        return jsonify({'error': 'Email et mot de passe requis'}), 400
+    result, err = login_user(email, password)
+    if err:
+        return jsonify({'error': err}), 401
+    return jsonify(result)
+
+@api.route('/auth/google', methods=['POST'])
+def auth_google():
+    data = request.get_json(silent=True) or {}
+    if not data.get('credential'):
+        return jsonify({'error': 'Token Google manquant'}), 400
+    result, err = login_or_register_google(data['credential'])
+    if err:
+        return jsonify({'error': err}), 401
+    return jsonify(result)
+
+@api.route('/auth/verify-email', methods=['POST'])
+def auth_verify_email():
+    data = request.get_json(silent=True) or {}
+    token = (data.get('token') or '').strip()
+    if not token or not verify_email_token(token):
+        return jsonify({'error': 'Lien invalide ou expiré'}), 400
+    return jsonify({'message': 'Email vérifié'})
+
+@api.route('/auth/resend-verification', methods=['POST'])
+def auth_resend_verification():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip()
+    if not email:
+        return jsonify({'error': 'Email requis'}), 400
+    # Same answer whether or not the account exists
+    resend_verification(email, data.get('lang', 'fr'))
+    return jsonify({'message': 'Si un compte non vérifié existe pour cet email, un nouveau lien a été envoyé.'})
+
+@api.route('/auth/me', methods=['GET'])
+def auth_me():
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Non connecté'}), 401
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT id, email, full_name, is_admin FROM users WHERE id = %s", (user_id,))
+        user = cur.fetchone()
+    if not user:
+        return jsonify({'error': 'Non connecté'}), 401
+    return jsonify({'user': sparse(user, requested_fields())})
+
+# ---------- Products ----------
+@api.route('/products', methods=['GET'])
+def products():
+    lang = request.args.get('lang', 'fr')
+    category = request.args.get('category', '').strip() or None
+    doc = catalog.get_list(lang, category)
+    if not doc:
+        return Response(b'[]', mimetype='application/json')
+    return document_response(doc)
+
+@api.route('/products/<int:product_id>', methods=['GET'])
+def product(product_id):
+    doc = catalog.get_product(product_id, request.args.get('lang', 'fr'))
+    if not doc:
+        return jsonify({'error': 'Produit introuvable'}), 404
+    return document_response(doc)
+
+@api.route('/products/<int:product_id>/stock', methods=['GET'])
+def product_stock(product_id):
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT stock FROM products WHERE id = %s AND is_active = TRUE", (product_id,))
+        row = cur.fetchone()
+    if not row:
+        return jsonify({'error': 'Produit introuvable'}), 404
+    return jsonify({'stock': row['stock']})
+
+@api.route('/products/<int:product_id>/recommendations', methods=['GET'])
+def product_recommendations(product_id):
+    limit = min(request.args.get('limit', 4, type=int), recommendations.TOP_K)
+    return jsonify(sparse(recommendations.for_product(product_id, limit), requested_fields()))
+
+# ---------- Cart ----------
+@api.route('/cart', methods=['GET'])
+def cart():
+    column, owner = cart_owner()
+    if not owner:
+        return jsonify([])
+    name = 'COALESCE(p.name_ar, p.name_fr)' if request.args.get('lang') == 'ar' else 'p.name_fr'
+    with get_cursor(commit=False) as cur:
+        cur.execute(f"""SELECT c.id, c.product_id, c.quantity, c.option_size, c.option_color,
+                        {name} AS name, p.price, p.image_url, p.stock
+                        FROM cart_items c JOIN products p ON p.id = c.product_id
+                        WHERE c.{column} = %s AND p.is_active = TRUE ORDER BY c.id""", (owner,))
+        items = cur.fetchall()
+    return jsonify(sparse(items, requested_fields()))
+
+@api.route('/cart', methods=['POST'])
+def cart_add():
+    data = request.get_json(silent=True) or {}
+    column, owner = cart_owner()
+    if not owner:
+        return jsonify({'error': 'Session panier manquante'}), 400
+    try:
+        product_id = int(data.get('product_id'))
+        quantity = max(int(data.get('quantity') or 1), 1)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Produit invalide'}), 400
+    option_size = (data.get('option_size') or '').strip() or None
+    option_color = (data.get('option_color') or '').strip() or None
+
+    with get_cursor(commit=True) as cur:
+        cur.execute("SELECT id FROM products WHERE id = %s AND is_active = TRUE", (product_id,))
+        if not cur.fetchone():
+            return jsonify({'error': 'Produit introuvable'}), 404
+        cur.execute(f"""SELECT id FROM cart_items WHERE {column} = %s AND product_id = %s
+                        AND COALESCE(option_size,'') = COALESCE(%s,'') AND COALESCE(option_color,'') = COALESCE(%s,'')""",
+                    (owner, product_id, option_size, option_color))
+        existing = cur.fetchone()
+        if existing:
+            cur.execute("UPDATE cart_items SET quantity = quantity + %s WHERE id = %s", (quantity, existing['id']))
+        else:
+            cur.execute(f"INSERT INTO cart_items ({column}, product_id, quantity, option_size, option_color) VALUES (%s, %s, %s, %s, %s)",
+                        (owner, product_id, quantity, option_size, option_color))
+    return jsonify({'message': 'Produit ajouté au panier'}), 201
+
+@api.route('/cart/<int:item_id>', methods=['PUT'])
+def cart_update(item_id):
+    data = request.get_json(silent=True) or {}
+    column, owner = cart_owner()
+    if not owner:
+        return jsonify({'error': 'Session panier manquante'}), 400
+    try:
+        quantity = int(data.get('quantity', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Quantité invalide'}), 400
+    with get_cursor(commit=True) as cur:
+        if quantity > 0:
+            cur.execute(f"UPDATE cart_items SET quantity = %s WHERE id = %s AND {column} = %s", (quantity, item_id, owner))
+        else:
+            cur.execute(f"DELETE FROM cart_items WHERE id = %s AND {column} = %s", (item_id, owner))
+    return jsonify({'message': 'Panier mis à jour'})
+
+@api.route('/cart/<int:item_id>', methods=['DELETE'])
+def cart_remove(item_id):
+    column, owner = cart_owner()
+    if not owner:
+        return jsonify({'error': 'Session panier manquante'}), 400
+    with get_cursor(commit=True) as cur:
+        cur.execute(f"DELETE FROM cart_items WHERE id = %s AND {column} = %s", (item_id, owner))
+    return jsonify({'message': 'Article supprimé'})
+
+# ---------- Discounts & checkout ----------
+@api.route('/discount/validate', methods=['POST'])
+def discount_validate():
+    data = request.get_json(silent=True) or {}
+    code = (data.get('code') or '').strip()
+    try:
+        subtotal = float(data.get('subtotal') or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Montant invalide'}), 400
+    if not code:
+        return jsonify({'error': 'Code requis'}), 400
+    result, err = discount_engine.evaluate(code, subtotal)
+    if err:
+        return jsonify({'error': err}), 400
+    return jsonify({'code': result['code'], 'discount_amount': result['discount_amount'], 'total': result['total']})
+
+@api.route('/checkout/start', methods=['POST'])
+def checkout_start():
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Veuillez vous connecter'}), 401
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT c.product_id, c.quantity, p.name_fr
+                       FROM cart_items c JOIN products p ON p.id = c.product_id WHERE c.user_id = %s""", (user_id,))
+        items = cur.fetchall()
+    missing = hold_cart(user_id, items)
+    if missing:
+        name = next(r['name_fr'] for r in items if r['product_id'] == missing)
+        return jsonify({'error': f'Stock insuffisant pour {name}', 'product_id': missing}), 409
+    return jsonify({'held': len(items)})
+
+@api.route('/checkout', methods=['POST'])
+def checkout():
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Veuillez vous connecter'}), 401
+    result, err = place_order(user_id, request.get_json(silent=True) or {})
+    if err:
+        return jsonify({'error': err}), 400
+    return jsonify(result), 201
+
+# ---------- Admin ----------
+@api.route('/admin/stats', methods=['GET'])
+@admin_required
+def admin_stats():
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT COUNT(*) AS total_orders,
+                              COALESCE(SUM(total) FILTER (WHERE status <> 'cancelled'), 0) AS total_sales
+                       FROM orders""")
+        stats = cur.fetchone()
+        cur.execute("SELECT COUNT(*) AS n FROM products WHERE is_active = TRUE")
+        stats['total_products'] = cur.fetchone()['n']
+        cur.execute("""SELECT created_at::date AS date, SUM(total) AS total, COUNT(*) AS count
+                       FROM orders WHERE created_at >= CURRENT_DATE - INTERVAL '30 days' AND status <> 'cancelled'
+                       GROUP BY 1 ORDER BY 1 DESC""")
+        stats['sales_by_day'] = cur.fetchall()
+    return jsonify(stats)
+
+@api.route('/admin/orders', methods=['GET'])
+@admin_required
+def admin_orders():
+    limit = min(request.args.get('limit', 200, type=int), 1000)
+    status = request.args.get('status')
+    with get_cursor(commit=False) as cur:
+        if status:
+            cur.execute("SELECT * FROM orders WHERE status = %s ORDER BY created_at DESC LIMIT %s", (status, limit))
+        else:
+            cur.execute("SELECT * FROM orders ORDER BY created_at DESC LIMIT %s", (limit,))
+        rows = cur.fetchall()
+    return jsonify(sparse(rows, requested_fields()))
+
+@api.route('/admin/orders/stream', methods=['GET'])
+def admin_orders_stream():
+    if not is_admin_token(request.args.get('jwt', '')):
+        return jsonify({'error': 'Non autorisé'}), 403
+    return event_stream_response()
+
+@api.route('/admin/orders/<int:order_id>', methods=['GET'])
+@admin_required
+def admin_order_detail(order_id):
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT * FROM orders WHERE id = %s", (order_id,))
+        order = cur.fetchone()
+        if not order:
+            return jsonify({'error': 'Commande introuvable'}), 404
+        cur.execute("SELECT * FROM order_items WHERE order_id = %s ORDER BY id", (order_id,))
+        order['items'] = cur.fetchall()
+    return jsonify(order)
+
+@api.route('/admin/orders/<int:order_id>/status', methods=['PATCH'])
+@admin_required
+def admin_order_status(order_id):
+    status = (request.get_json(silent=True) or {}).get('status')
+    if status not in ORDER_STATUSES:
+        return jsonify({'error': 'Statut invalide'}), 400
+    try:
+        with get_cursor(commit=True) as cur:
+            cur.execute("SELECT status FROM orders WHERE id = %s FOR UPDATE", (order_id,))
+            order = cur.fetchone()
+            if not order:
+                return jsonify({'error': 'Commande introuvable'}), 404
+            cur.execute("UPDATE orders SET status = %s WHERE id = %s", (status, order_id))
+            # Cancelling gives the order's stock back; un-cancelling takes it again.
+            if (order['status'] == 'cancelled') != (status == 'cancelled'):
+                set_order_cancelled(cur, order_id, status == 'cancelled')
+    except OutOfStock as e:
+        return jsonify({'error': 'Stock insuffisant pour rétablir cette commande', 'product_id': e.product_id}), 409
+    return jsonify({'id': order_id, 'status': status})
+
+@api.route('/admin/payments/reconcile', methods=['POST'])
+@admin_required
+def admin_reconcile_payments():
+    statement = request.files.get('statement')
+    if not statement:
+        return jsonify({'error': 'Relevé CSV requis'}), 400
+    result, err = reconciliation.reconcile(statement.stream, statement.filename or '')
+    if err:
+        return jsonify({'error': err}), 400
+    return jsonify(result)
+
+PRODUCT_FIELDS = ('name_fr', 'name_ar', 'description_fr', 'description_ar', 'price', 'image_url',
+                  'category', 'stock', 'options_sizes', 'options_colors', 'is_active')
+
+def _product_values(data):
+    values = {k: data[k] for k in PRODUCT_FIELDS if k in data and data[k] is not None}
+    for k in ('options_sizes', 'options_colors'):
+        if isinstance(values.get(k), list):
+            values[k] = ','.join(values[k])
+    return values
+
+@api.route('/admin/products', methods=['GET'])
+@admin_required
+def admin_products():
+    # products.stock is what is left after checkout holds; admins see and edit stock on hand.
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT p.*, COALESCE(h.held, 0) AS held FROM products p
+                       LEFT JOIN (SELECT product_id, SUM(quantity) AS held FROM stock_reservations
+                                  WHERE status = 'held' GROUP BY product_id) h ON h.product_id = p.id
+                       ORDER BY p.created_at DESC""")
+        rows = cur.fetchall()
+    for r in rows:
+        r['stock'] += r['held']
+    return jsonify(sparse(rows, requested_fields()))
+
+@api.route('/admin/products', methods=['POST'])
+@admin_required
+def admin_create_product():
+    values = _product_values(request.get_json(silent=True) or {})
+    if not values.get('name_fr') or 'price' not in values:
+        return jsonify({'error': 'Nom et prix requis'}), 400
+    columns = ', '.join(values)
+    with get_cursor(commit=True) as cur:
+        cur.execute(f"INSERT INTO products ({columns}) VALUES ({', '.join(['%s'] * len(values))}) RETURNING *",
+                    tuple(values.values()))
+        row = cur.fetchone()
+    catalog.refresh_product(row['id'])
+    return jsonify(row), 201
+
+@api.route('/admin/products/<int:product_id>', methods=['PUT'])
+@admin_required
+def admin_update_product(product_id):
+    values = _product_values(request.get_json(silent=True) or {})
+    if not values:
+        return jsonify({'error': 'Aucune modification'}), 400
+    assignments = ', '.join(f"{k} = %s" for k in values)
+    with get_cursor(commit=True) as cur:
+        held = 0
+        if 'stock' in values:
+            # The admin sets stock on hand; keep what checkouts hold out of products.stock.
+            # Locking the product row first makes concurrent holds wait for this update.
+            cur.execute("SELECT id FROM products WHERE id = %s FOR UPDATE", (product_id,))
+            if not cur.fetchone():
+                return jsonify({'error': 'Produit introuvable'}), 404
+            held = held_quantity(cur, product_id)
+            if int(values['stock']) < held:
+                return jsonify({'error': f'Stock inférieur aux {held} articles réservés en caisse'}), 400
+            values['stock'] = int(values['stock']) - held
+        cur.execute(f"UPDATE products SET {assignments} WHERE id = %s RETURNING *", (*values.values(), product_id))
+        row = cur.fetchone()
+    if not row:
+        return jsonify({'error': 'Produit introuvable'}), 404
+    row['stock'] += held
+    row['held'] = held
+    catalog.refresh_product(product_id)
+    return jsonify(row)
+
+@api.route('/admin/products/<int:product_id>', methods=['DELETE'])
+@admin_required
+def admin_delete_product(product_id):
+    with get_cursor(commit=True) as cur:
+        cur.execute("SELECT 1 FROM order_items WHERE product_id = %s LIMIT 1", (product_id,))
+        if cur.fetchone():
+            # Ordered products stay referenced by order_items; hide them instead.
+            cur.execute("UPDATE products SET is_active = FALSE WHERE id = %s", (product_id,))
+        else:
+            cur.execute("DELETE FROM products WHERE id = %s", (product_id,))
+    catalog.refresh_product(product_id)
+    return jsonify({'message': 'Produit supprimé'})
+
+DISCOUNT_FIELDS = ('code', 'percent_off', 'amount_off', 'min_purchase', 'max_uses', 'valid_from', 'valid_until', 'is_active')
+
+def _discount_values(data):
+    values = {k: data[k] for k in DISCOUNT_FIELDS if k in data}
+    for k in ('valid_from', 'valid_until'):
+        if k in values and not values[k]:
+            values[k] = None
+    if values.get('code'):
+        values['code'] = values['code'].strip()
+    return values
+
+@api.route('/admin/discounts', methods=['GET'])
+@admin_required
+def admin_discounts():
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT * FROM discounts ORDER BY created_at DESC")
+        rows = cur.fetchall()
+    return jsonify(sparse(rows, requested_fields()))
+
+@api.route('/admin/discounts', methods=['POST'])
+@admin_required
+def admin_create_discount():
+    values = _discount_values(request.get_json(silent=True) or {})
+    if not values.get('code'):
+        return jsonify({'error': 'Code requis'}), 400
+    with get_cursor(commit=True) as cur:
+        cur.execute("SELECT id FROM discounts WHERE LOWER(code) = LOWER(%s)", (values['code'],))
+        if cur.fetchone():
+            return jsonify({'error': 'Code déjà utilisé'}), 400
+        cur.execute(f"INSERT INTO discounts ({', '.join(values)}) VALUES ({', '.join(['%s'] * len(values))}) RETURNING *",
+                    tuple(values.values()))
+        row = cur.fetchone()
+    discount_engine.invalidate()
+    return jsonify(row), 201
+
+@api.route('/admin/discounts/<int:discount_id>', methods=['PUT'])
+@admin_required
+def admin_update_discount(discount_id):
+    values = _discount_values(request.get_json(silent=True) or {})
+    if not values:
+        return jsonify({'error': 'Aucune modification'}), 400
+    assignments = ', '.join(f"{k} = %s" for k in values)
+    with get_cursor(commit=True) as cur:
+        cur.execute(f"UPDATE discounts SET {assignments} WHERE id = %s RETURNING *", (*values.values(), discount_id))
+        row = cur.fetchone()
+    if not row:
+        return jsonify({'error': 'Réduction introuvable'}), 404
+    discount_engine.invalidate()
+    return jsonify(row)
+
+@api.route('/admin/discounts/<int:discount_id>', methods=['DELETE'])
+@admin_required
+def admin_delete_discount(discount_id):
+    with get_cursor(commit=True) as cur:
+        cur.execute("DELETE FROM discounts WHERE id = %s", (discount_id,))
+    discount_engine.invalidate()
+    return jsonify({'message': 'Réduction supprimée'})
+
+@api.route('/admin/settings/telegram', methods=['GET'])
+@admin_required
+def admin_telegram_get():
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT value FROM admin_settings WHERE key = 'telegram_chat_id'")
+        row = cur.fetchone()
+    return jsonify({'telegram_chat_id': row['value'] if row else ''})
+
+@api.route('/admin/settings/telegram', methods=['POST'])
+@admin_required
+def admin_telegram_set():
+    chat_id = str((request.get_json(silent=True) or {}).get('telegram_chat_id') or '').strip()
+    with get_cursor(commit=True) as cur:
+        cur.execute(
+            """INSERT INTO admin_settings (key, value, updated_at) VALUES ('telegram_chat_id', %s, CURRENT_TIMESTAMP)
+               ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP""",
+            (chat_id,),
+        )
+    if chat_id:
+        send_telegram_notification("✅ DZ Clothes – Notifications Telegram configurées.")
+    return jsonify({'telegram_chat_id': chat_id})
+
+@api.route('/admin/jobs', methods=['GET'])
+@admin_required
+def admin_jobs():
+    return jsonify({'jobs': scheduler.job_status(), 'runs': scheduler.recent_runs(min(request.args.get('limit', 50, type=int), 500))})
+
+@api.route('/admin/jobs/<name>/run', methods=['POST'])
+@admin_required
+def admin_run_job(name):
+    if not scheduler.run_now(name):
+        return jsonify({'error': 'Tâche introuvable'}), 404
+    return jsonify({'message': 'Tâche planifiée', 'name': name})
+
+# ---------- Batch ----------
+@api.route('/batch', methods=['POST'])
+def batch():
+    """Run several GET calls in one round trip on one pooled connection.
+
+    Body: {"requests": ["/api/auth/me", "/api/cart?lang=fr", ...]} (or {"path": ...} objects).
+    Each sub-response body is spliced in as already-encoded JSON, not re-serialized.
+    """
+    calls = (request.get_json(silent=True) or {}).get('requests')
+    if not isinstance(calls, list) or not calls:
+        return jsonify({'error': 'Aucune requête'}), 400
+    if len(calls) > BATCH_MAX_CALLS:
+        return jsonify({'error': f'{BATCH_MAX_CALLS} requêtes maximum'}), 400
+    headers = {k: request.headers[k] for k in BATCH_FORWARDED_HEADERS if k in request.headers}
+
+    parts = []
+    with pinned_connection():
+        for call in calls:
+            path = call.get('path') if isinstance(call, dict) else call
+            if not isinstance(path, str) or not path.startswith('/api/') or path.startswith('/api/batch'):
+                status, body = 400, orjson.dumps({'error': 'Chemin invalide'})
+            else:
+                environ = EnvironBuilder(path=path, method='GET', headers=headers).get_environ()
+                with current_app.request_context(environ):
+                    resp = current_app.full_dispatch_request()
+                status = resp.status_code
+                body = resp.get_data() if resp.mimetype == 'application/json' else b''
+                body = body or orjson.dumps({'error': resp.status} if status >= 400 else None)
+            parts.append(b'{"path":' + orjson.dumps(path) + b',"status":' + str(status).encode() + b',"body":' + body + b'}')
+    return Response(b'{"responses":[' + b','.join(parts) + b']}', mimetype='application/json')
@@ -11,13 +11,25 @@ from db import get_cursor, init_db, seed_admin, seed_products
 from auth import (
     register_user,
     verify_email_token,
+    resend_verification,
     login_user,
     login_or_register_google,
 )
 from mail_service import send_verification_email
 from telegram_service import notify_new_order, send_telegram_notification
+from inventory import hold_cart
+from orders import place_order
+from api import api, ORJSONProvider, event_stream_response
+from assets import assets
+import catalog
+import partitions
+import recommendations
+import reconciliation
+import scheduler
+from jobs import register_default_jobs
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config.from_object('config.Config')
 app.secret_key = os.getenv('JWT_SECRET_KEY', 'dev-secret-dz-clothes')
 CORS(app, origins=os.getenv('FRONTEND_URL', 'https://dzclothes.netlify.app').split(','), supports_credentials=True)
@@ -86,8 +98,9 @@ def product_detail(product_id):
     
     sizes = [x.strip() for x in (product.get('options_sizes') or '').split(',') if x.strip()]
     colors = [x.strip() for x in (product.get('options_colors') or '').split(',') if x.strip()]
+    related = recommendations.for_product(product_id)
     
-    return render_template('product.html', product=product, sizes=sizes, colors=colors, lang=lang, user=session.get('user'))
+    return render_template('product.html', product=product, sizes=sizes, colors=colors, recommendations=related, lang=lang, user=session.get('user'))
 
 @app.route('/cart')
 def cart_page():
@@ -133,6 +146,12 @@ def checkout_page():
         flash('Votre panier est vide', 'error')
         return redirect(url_for('shop'))
     
+    missing = hold_cart(user_id, items)
+    if missing:
+        name = next(item['name_fr'] for item in items if item['product_id'] == missing)
+        flash(f'Stock insuffisant pour {name}', 'error')
+        return redirect(url_for('cart_page'))
+    
     subtotal = sum(float(item['price']) * item['quantity'] for item in items)
     
     return render_template('checkout.html', items=items, subtotal=subtotal, lang=lang, user=session.get('user'))
@@ -157,12 +176,28 @@ def verify_email_page():
 @app.route('/admin')
 @admin_required_web
 def admin_dashboard():
-    return render_template('admin/dashboard.html', lang=session.get('lang', 'fr'), user=session.get('user'))
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT COUNT(*) AS total_orders,
+                              COALESCE(SUM(total) FILTER (WHERE status <> 'cancelled'), 0) AS total_sales
+                       FROM orders""")
+        stats = cur.fetchone()
+        cur.execute("SELECT COUNT(*) AS n FROM products WHERE is_active = TRUE")
+        stats['total_products'] = cur.fetchone()['n']
+    return render_template('admin/dashboard.html', stats=stats, lang=session.get('lang', 'fr'), user=session.get('user'))
 
 @app.route('/admin/orders')
 @admin_required_web
 def admin_orders():
-    return render_template('admin/orders.html', lang=session.get('lang', 'fr'), user=session.get('user'))
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT id, order_number, status, total, email, full_name, baridi_phone, baridi_reference, created_at
+                       FROM orders ORDER BY created_at DESC LIMIT 50""")
+        orders = cur.fetchall()
+    return render_template('admin/orders.html', orders=orders, lang=session.get('lang', 'fr'), user=session.get('user'))
+
+@app.route('/admin/orders/stream')
+@admin_required_web
+def admin_orders_stream():
+    return event_stream_response()
 
 @app.route('/admin/products')
 @admin_required_web
@@ -174,10 +209,34 @@ def admin_products():
 def admin_discounts():
     return render_template('admin/discounts.html', lang=session.get('lang', 'fr'), user=session.get('user'))
 
+@app.route('/admin/payments', methods=['GET', 'POST'])
+@admin_required_web
+def admin_payments():
+    result = None
+    if request.method == 'POST':
+        statement = request.files.get('statement')
+        if not statement or not statement.filename:
+            flash('Veuillez choisir un relevé CSV', 'error')
+        else:
+            result, err = reconciliation.reconcile(statement.stream, statement.filename)
+            if err:
+                flash(err, 'error')
+    return render_template('admin/payments.html', result=result, lang=session.get('lang', 'fr'), user=session.get('user'))
+
 @app.route('/admin/settings')
 @admin_required_web
 def admin_settings():
-    return render_template('admin/settings.html', lang=session.get('lang', 'fr'), user=session.get('user'))
+    return render_template('admin/settings.html', jobs=scheduler.job_status(), runs=scheduler.recent_runs(),
+                           lang=session.get('lang', 'fr'), user=session.get('user'))
+
+@app.route('/action/admin/jobs/<name>/run', methods=['POST'])
+@admin_required_web
+def action_run_job(name):
+    if scheduler.run_now(name):
+        flash(f'Tâche {name} planifiée', 'success')
+    else:
+        flash('Tâche introuvable', 'error')
+    return redirect(url_for('admin_settings'))
 
 # ---------- Auth Actions ----------
 @app.route('/action/register', methods=['POST'])
@@ -241,7 +300,17 @@ def action_verify_email():
         return redirect(url_for('login_page'))
     
     flash('Lien invalide ou expiré', 'error')
-    return redirect(url_for('register_page'))
+    return redirect(url_for('verify_email_page'))
+
+@app.route('/action/resend-verification', methods=['POST'])
+def action_resend_verification():
+    email = request.form.get('email', '').strip()
+    if not email:
+        flash('Email requis', 'error')
+        return redirect(url_for('verify_email_page'))
+    resend_verification(email, session.get('lang', 'fr'))
+    flash('Si un compte non vérifié existe pour cet email, un nouveau lien a été envoyé.', 'success')
+    return redirect(url_for('login_page'))
 
 # ---------- Cart Actions ----------
 @app.route('/action/add-to-cart', methods=['POST'])
@@ -323,66 +392,12 @@ def action_remove_cart(item_id):
 @app.route('/action/checkout', methods=['POST'])
 @login_required_web
 def action_checkout():
-    user_id = session.get('user_id')
-    baridi_phone = request.form.get('baridi_phone', '').strip()
-    baridi_reference = request.form.get('baridi_reference', '').strip()
-    shipping_address = request.form.get('shipping_address', '').strip()
-    email = request.form.get('email', '').strip()
-    full_name = request.form.get('full_name', '').strip()
-    discount_code = request.form.get('discount_code', '').strip()
-    
-    if not email or not full_name or not shipping_address or not baridi_phone or not baridi_reference:
-        flash('Tous les champs sont requis', 'error')
+    result, err = place_order(session.get('user_id'), request.form)
+    if err:
+        flash(err, 'error')
         return redirect(url_for('checkout_page'))
     
-    with get_cursor(commit=False) as cur:
-        cur.execute("""SELECT c.id, c.product_id, c.quantity, c.option_size, c.option_color, p.name_fr, p.name_ar, p.price, p.stock
-                       FROM cart_items c JOIN products p ON p.id = c.product_id WHERE c.user_id = %s""", (user_id,))
-        items = cur.fetchall()
-    
-    if not items:
-        flash('Panier vide', 'error')
-        return redirect(url_for('shop'))
-    
-    subtotal = sum(float(r['price']) * r['quantity'] for r in items)
-    discount_amount = 0.0
-    
-    if discount_code:
-        with get_cursor(commit=False) as cur:
-            cur.execute("""SELECT percent_off, amount_off, min_purchase, max_uses, used_count, is_active
-                           FROM discounts WHERE UPPER(code) = %s""", (discount_code.upper(),))
-            d = cur.fetchone()
-        if d and d['is_active'] and subtotal >= float(d['min_purchase'] or 0):
-            if d['max_uses'] is None or (d['used_count'] or 0) < d['max_uses']:
-                if d['percent_off']:
-                    discount_amount = subtotal * float(d['percent_off']) / 100
-                if d['amount_off']:
-                    discount_amount = max(discount_amount, float(d['amount_off']))
-                discount_amount = min(discount_amount, subtotal)
-    
-    total = round(subtotal - discount_amount, 2)
-    order_number = f"DZ-{os.urandom(4).hex().upper()}"
-    
-    with get_cursor(commit=True) as cur:
-        cur.execute("""INSERT INTO orders (user_id, order_number, status, total, discount_amount, baridi_phone, baridi_reference, shipping_address, email, full_name)
-                       VALUES (%s, %s, 'pending', %s, %s, %s, %s, %s, %s, %s) RETURNING id""",
-                    (user_id, order_number, total, discount_amount, baridi_phone, baridi_reference, shipping_address, email, full_name))
-        order_id = cur.fetchone()['id']
-        
-        for r in items:
-            cur.execute("""INSERT INTO order_items (order_id, product_id, product_name_fr, product_name_ar, price, quantity, option_size, option_color)
-                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                        (order_id, r['product_id'], r['name_fr'], r['name_ar'], r['price'], r['quantity'], r.get('option_size'), r.get('option_color')))
-        
-        if discount_code and discount_amount > 0:
-            cur.execute("UPDATE discounts SET used_count = COALESCE(used_count, 0) + 1 WHERE UPPER(code) = %s", (discount_code.upper(),))
-        
-        cur.execute("DELETE FROM cart_items WHERE user_id = %s", (user_id,))
-    
-    items_summary = '\n'.join(f"- {r['name_fr']} x{r['quantity']} = {float(r['price'])*r['quantity']:.2f} DA" for r in items)
-    notify_new_order(order_number, total, email, items_summary)
-    
-    flash(f'Commande enregistrée! Numéro: {order_number}', 'success')
+    flash(f"Commande enregistrée! Numéro: {result['order_number']}", 'success')
     return redirect(url_for('home'))
 
 # ---------- Language Switch ----------
@@ -391,9 +406,9 @@ def action_set_lang(lang):
     session['lang'] = lang if lang in ['fr', 'ar'] else 'fr'
     return redirect(request.referrer or url_for('home'))
 
-# ---------- API Routes (for compatibility) ----------
-# Keep all your existing API routes here
-# ... (copy all API routes from original app.py)
+# ---------- API Routes ----------
+app.register_blueprint(api)
+app.register_blueprint(assets)
 
 # ---------- Init & run ----------
 @app.route('/health', methods=['GET'])
@@ -402,8 +417,12 @@ def health():
 
 with app.app_context():
     init_db()
+    partitions.ensure_partitions()
     seed_admin()
     seed_products()
+    catalog.rebuild_all()
+    register_default_jobs()
+    scheduler.start()
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
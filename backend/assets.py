@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Fingerprinted, precompressed static assets.
+Run: python assets.py build                     # static/ -> static/dist/ + manifest.json
+     python assets.py precompress ../frontend/dist  # .gz/.br next to an existing build (Vite)
+Templates call asset_url('css/style.css'); /assets/<hashed name> serves the .br or .gz
+variant the browser accepts, cached forever (the name changes with the content).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import brotli
+from flask import Blueprint, abort, request, send_file, url_for
+from werkzeug.utils import safe_join
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = os.path.join(DIST_DIR, 'manifest.json')
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.svg', '.json', '.txt', '.html', '.xml', '.map', '.ico')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preferred first
+MAX_AGE = 31536000
+HASHED_NAME = re.compile(r'\.[0-9a-f]{10}(\.[^./]+)?$')  # stem.<fingerprint>.ext, as build() names files
+
+assets = Blueprint('assets', __name__, url_prefix='/assets')
+
+_manifest = None
+_manifest_mtime = None
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=5).hexdigest()
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def compress(path: str, data: bytes):
+    """Write path.gz and path.br when they are smaller than the original."""
+    if not path.endswith(COMPRESSIBLE):
+        return
+    variants = {
+        '.gz': gzip.compress(data, compresslevel=9, mtime=0),
+        '.br': brotli.compress(data, quality=11),
+    }
+    for suffix, body in variants.items():
+        if len(body) < len(data):
+            _write(path + suffix, body)
+
+def build(source=STATIC_DIR, dest=DIST_DIR):
+    """Copy every static file to dest under a content-hashed name and write the manifest.
+    Older hashed files are kept so pages cached with previous names still load."""
+    manifest = {}
+    for root, dirs, files in os.walk(source):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dest]
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, source).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(rel)
+            hashed = f"{stem}.{fingerprint(data)}{ext}"
+            out = os.path.join(dest, hashed)
+            if not os.path.exists(out):
+                _write(out, data)
+                compress(out, data)
+            manifest[rel] = hashed
+    _write(os.path.join(dest, 'manifest.json'), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    print(f"[Assets] ✅ {len(manifest)} files fingerprinted into {dest}")
+    return manifest
+
+def precompress(directory: str):
+    """Add .gz/.br variants to an already fingerprinted build, e.g. Vite's dist/."""
+    count = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if path.endswith(COMPRESSIBLE):
+                with open(path, 'rb') as f:
+                    compress(path, f.read())
+                count += 1
+    print(f"[Assets] ✅ {count} files precompressed in {directory}")
+
+def manifest() -> dict:
+    """The build manifest, reloaded when `python assets.py build` rewrites it."""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(MANIFEST)
+    except OSError:
+        return {}
+    if mtime != _manifest_mtime:
+        with open(MANIFEST, 'rb') as f:
+            _manifest = json.load(f)
+        _manifest_mtime = mtime
+    return _manifest
+
+@assets.app_template_global()
+def asset_url(path: str) -> str:
+    """Fingerprinted URL of a static file, or the plain /static URL before the first build."""
+    hashed = manifest().get(path)
+    if not hashed:
+        return url_for('static', filename=path)
+    return url_for('assets.serve', filename=hashed)
+
+@assets.route('/<path:filename>')
+def serve(filename):
+    # Only fingerprinted names are immutable; manifest.json and other unhashed files
+    # are not served from here. Names from older builds still are, as long as the file is kept.
+    if not HASHED_NAME.search(filename):
+        abort(404)
+    path = safe_join(DIST_DIR, filename)
+    if not path or not os.path.isfile(path):
+        abort(404)
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(path + suffix):
+            encoding, path = name, path + suffix
+            break
+
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                         conditional=True, max_age=MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build')
+    p = sub.add_parser('precompress')
+    p.add_argument('directory')
+    args = parser.parse_args()
+    if args.command == 'build':
+        build()
+    else:
+        precompress(args.directory)
+
+if __name__ == "__main__":
+    main()
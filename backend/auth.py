@@ -1,6 +1,9 @@
+import hashlib
+import secrets
 import uuid
 import requests
-from flask_jwt_extended import create_access_token, get_jwt_identity, verify_jwt_in_request
+from flask import current_app
+from flask_jwt_extended import create_access_token, decode_token, get_jwt_identity, verify_jwt_in_request
 from flask_bcrypt import Bcrypt
 from db import get_cursor
 from mail_service import send_verification_email
@@ -28,34 +31,102 @@ def verify_google_token(id_token: str):
     except Exception:
         return None
 
+def hash_token(token: str) -> bytes:
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+def issue_verification_token(cur, user_id: int) -> str:
+    """Replace the user's verification token; only its SHA-256 is stored."""
+    token = secrets.token_urlsafe(32)
+    cur.execute("DELETE FROM email_verification_tokens WHERE user_id = %s", (user_id,))
+    cur.execute(
+        """INSERT INTO email_verification_tokens (token_hash, user_id, expires_at)
+           VALUES (%s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 hour')""",
+        (hash_token(token), user_id, Config.VERIFICATION_TOKEN_TTL_HOURS),
+    )
+    return token
+
+def _send_verification(email: str, token: str, lang: str):
+    link = f"{Config.FRONTEND_URL}{Config.VERIFY_EMAIL_URL_PATH}?token={token}"
+    send_verification_email(email, link, lang)
+
 def register_user(email: str, password: str, full_name: str = None, lang: str = 'fr'):
     with get_cursor(commit=True) as cur:
         cur.execute("SELECT id FROM users WHERE email = %s", (email.lower(),))
         if cur.fetchone():
             return None, 'Email déjà utilisé'
-        token = str(uuid.uuid4())
         pw_hash = bcrypt.generate_password_hash(password).decode('utf-8')
         cur.execute("SELECT COUNT(*) AS n FROM users")
         is_first = cur.fetchone()['n'] == 0
         cur.execute(
-            """INSERT INTO users (email, password_hash, full_name, verification_token, is_verified, is_admin)
-               VALUES (%s, %s, %s, %s, FALSE, %s) RETURNING id""",
-            (email.lower(), pw_hash, full_name, token, is_first),
+            """INSERT INTO users (email, password_hash, full_name, is_verified, is_admin)
+               VALUES (%s, %s, %s, FALSE, %s) RETURNING id""",
+            (email.lower(), pw_hash, full_name, is_first),
         )
         row = cur.fetchone()
         user_id = row['id']
-    link = f"{Config.FRONTEND_URL}{Config.VERIFY_EMAIL_URL_PATH}?token={token}"
-    send_verification_email(email, link, lang)
+        token = issue_verification_token(cur, user_id)
+    _send_verification(email, token, lang)
     return user_id, None
 
+def resend_verification(email: str, lang: str = 'fr'):
+    """Rotate and re-send the token of an unverified account. Silent for unknown emails."""
+    with get_cursor(commit=True) as cur:
+        cur.execute(
+            """SELECT u.id FROM users u WHERE u.email = %s AND u.is_verified = FALSE
+               AND NOT EXISTS (SELECT 1 FROM email_verification_tokens t WHERE t.user_id = u.id
+                               AND t.created_at > CURRENT_TIMESTAMP - %s * INTERVAL '1 second')""",
+            (email.lower(), Config.VERIFICATION_RESEND_SECONDS),
+        )
+        row = cur.fetchone()
+        if not row:
+            return False
+        token = issue_verification_token(cur, row['id'])
+    _send_verification(email, token, lang)
+    return True
+
 def verify_email_token(token: str):
+    """Consume a token. Looked up by its hash on the primary key, so the stored value never
+    meets the raw token in a comparison whose timing could leak it."""
     with get_cursor(commit=True) as cur:
         cur.execute(
-            "UPDATE users SET is_verified = TRUE, verification_token = NULL WHERE verification_token = %s RETURNING id",
-            (token,),
+            """WITH t AS (
+                   DELETE FROM email_verification_tokens
+                   WHERE token_hash = %s AND expires_at > CURRENT_TIMESTAMP RETURNING user_id
+               )
+               UPDATE users SET is_verified = TRUE FROM t WHERE users.id = t.user_id RETURNING users.id""",
+            (hash_token(token),),
         )
         return cur.fetchone() is not None
 
+def purge_unverified(batch_size=500):
+    """Delete expired tokens, then accounts never verified within UNVERIFIED_ACCOUNT_DAYS,
+    in small batches so users is never locked for long."""
+    deleted = {'tokens': 0, 'users': 0}
+    queries = {
+        'tokens': """DELETE FROM email_verification_tokens WHERE token_hash IN (
+                         SELECT token_hash FROM email_verification_tokens
+                         WHERE expires_at < CURRENT_TIMESTAMP LIMIT %s FOR UPDATE SKIP LOCKED
+                     )""",
+        'users': """DELETE FROM users WHERE id IN (
+                        SELECT u.id FROM users u
+                        WHERE u.is_verified = FALSE AND u.is_admin = FALSE
+                          AND u.created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+                          AND NOT EXISTS (SELECT 1 FROM email_verification_tokens t WHERE t.user_id = u.id)
+                          AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.user_id = u.id)
+                        ORDER BY u.id LIMIT %s FOR UPDATE SKIP LOCKED
+                    )""",
+    }
+    for kind, sql in queries.items():
+        params = (batch_size,) if kind == 'tokens' else (Config.UNVERIFIED_ACCOUNT_DAYS, batch_size)
+        while True:
+            with get_cursor(commit=True) as cur:
+                cur.execute(sql, params)
+                n = cur.rowcount
+            deleted[kind] += n
+            if n < batch_size:
+                break
+    return deleted
+
 def login_user(email: str, password: str):
     with get_cursor(commit=False) as cur:
         cur.execute(
@@ -85,6 +156,15 @@ def get_current_user_admin():
     except Exception:
         return False
 
+def is_admin_token(token: str) -> bool:
+    """Check a raw admin access token. Only for ?jwt= on the order stream: EventSource
+    cannot send an Authorization header, and tokens are accepted from headers everywhere else."""
+    try:
+        claims = decode_token(token)
+        return claims.get('type') == 'access' and claims[current_app.config['JWT_IDENTITY_CLAIM']].get('is_admin') is True
+    except Exception:
+        return False
+
 def login_or_register_google(id_token: str):
     """Verify Google token, find or create user, return (result_dict, error)."""
     payload = verify_google_token(id_token)
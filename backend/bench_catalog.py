@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request dict-and-jsonify vs pre-serialized catalog documents (catalog.py).
+Run: python bench_catalog.py [--products 200] [--requests 2000]
+Uses synthetic rows shaped like RealDictCursor results, so no database is needed.
+It measures serialization cost only: both handlers issue one query per request
+(products rows vs the product_documents row), and that round trip is not timed.
+The stored path is timed as the copy of the BYTEA value psycopg2 hands back.
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from catalog import LANGS, product_document, encode
+
+def fake_rows(n):
+    return [{
+        'id': i,
+        'name_fr': f"Produit {i}",
+        'name_ar': f"منتج {i}",
+        'description_fr': "T-shirt en coton confortable, coupe régulière. " * 3,
+        'description_ar': "تيشيرت قطني مريح، قصة عادية. " * 3,
+        'price': Decimal('2500.00') + i,
+        'image_url': f"https://images.example.com/{i}.jpg",
+        'category': ('T-shirts', 'Pantalons', 'Vestes', 'Robes')[i % 4],
+        'stock': 50,
+        'options_sizes': 'S,M,L,XL',
+        'options_colors': 'Blanc,Noir,Gris,Bleu marine',
+        'created_at': datetime(2024, 1, 1),
+    } for i in range(1, n + 1)]
+
+def dict_and_jsonify(rows, lang):
+    """What a handler does without the projection: shape rows then encode like flask.jsonify."""
+    ar = lang == 'ar'
+    out = []
+    for r in rows:
+        out.append({
+            'id': r['id'],
+            'name': (r['name_ar'] if ar else None) or r['name_fr'],
+            'description': (r['description_ar'] if ar else None) or r['description_fr'],
+            'price': r['price'],
+            'image_url': r['image_url'],
+            'category': r['category'],
+            'options_sizes': [x.strip() for x in (r['options_sizes'] or '').split(',') if x.strip()],
+            'options_colors': [x.strip() for x in (r['options_colors'] or '').split(',') if x.strip()],
+        })
+    return json.dumps(out, default=str, sort_keys=True).encode('utf-8')
+
+def timed(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = fake_rows(args.products)
+    # psycopg2 returns BYTEA as a memoryview; catalog.get_document copies it to bytes.
+    store = {lang: memoryview(encode([product_document(r, lang) for r in rows])) for lang in LANGS}
+
+    baseline = timed(lambda i: dict_and_jsonify(rows, LANGS[i % 2]), args.requests)
+    projected = timed(lambda i: bytes(store[LANGS[i % 2]]), args.requests)
+    print(f"list of {args.products} products, {args.requests} requests (serialization only, query time excluded)")
+    print(f"  dict + jsonify : {baseline:10.1f} us/request")
+    print(f"  stored bytes   : {projected:10.3f} us/request ({len(store['fr'])} bytes)")
+    print(f"  CPU saved      : {baseline - projected:10.1f} us/request")
+
+if __name__ == "__main__":
+    main()
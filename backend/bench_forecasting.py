@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Benchmark: forecasting.py's per-SKU computations on synthetic sales.
+Run: python bench_forecasting.py [--variants 50000] [--products 8000] [--days 56]
+No database needed: the sales matrix and stock levels are generated in memory.
+"""
+import argparse
+import time
+import numpy as np
+
+from forecasting import forecast
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--variants', type=int, default=50000)
+    parser.add_argument('--products', type=int, default=8000)
+    parser.add_argument('--days', type=int, default=56)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    product_ids = np.arange(1, args.products + 1)
+    variant_products = np.sort(rng.integers(1, args.products + 1, args.variants))
+    sales = rng.poisson(rng.gamma(0.5, 1.0, (args.variants, 1)), (args.variants, args.days)).astype(np.float64)
+    stock = rng.integers(0, 200, args.products).astype(np.float64)
+
+    t0 = time.perf_counter()
+    result = forecast(variant_products, sales, product_ids, stock)
+    elapsed = time.perf_counter() - t0
+
+    alerts = int(((result['demand'] > 0) & (result['days_left'] < 14)).sum())
+    print(f"{args.variants} variants x {args.days} days, {args.products} products: {elapsed * 1000:.1f} ms, {alerts} alerts")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for stock holds (inventory.py).
+Run: python bench_inventory.py [--buyers 500] [--stock 5]
+Needs DATABASE_URL and a server accepting as many connections as buyers.
+Creates throwaway users and a product, then removes them.
+"""
+import argparse
+import threading
+import time
+from dotenv import load_dotenv
+load_dotenv()
+
+from db import get_cursor, init_db
+from inventory import hold_cart
+
+def setup(buyers, stock):
+    with get_cursor(commit=True) as cur:
+        cur.execute(
+            """INSERT INTO products (name_fr, price, stock, is_active)
+               VALUES ('bench-inventory', 1000, %s, FALSE) RETURNING id""",
+            (stock,),
+        )
+        product_id = cur.fetchone()['id']
+        user_ids = []
+        for i in range(buyers):
+            cur.execute(
+                """INSERT INTO users (email, password_hash, is_verified)
+                   VALUES (%s, 'x', TRUE) RETURNING id""",
+                (f"bench-inventory-{i}@bench.local",),
+            )
+            user_ids.append(cur.fetchone()['id'])
+    return product_id, user_ids
+
+def teardown(product_id):
+    with get_cursor(commit=True) as cur:
+        cur.execute("DELETE FROM users WHERE email LIKE %s", ('bench-inventory-%@bench.local',))
+        cur.execute("DELETE FROM products WHERE id = %s", (product_id,))
+
+def run_round(product_id, user_ids):
+    barrier = threading.Barrier(len(user_ids))
+    won = []
+    latencies = []
+    lock = threading.Lock()
+
+    def buyer(user_id):
+        barrier.wait()
+        t0 = time.perf_counter()
+        missing = hold_cart(user_id, [{'product_id': product_id, 'quantity': 1}])
+        dt = time.perf_counter() - t0
+        with lock:
+            latencies.append(dt)
+            if missing is None:
+                won.append(user_id)
+
+    threads = [threading.Thread(target=buyer, args=(u,)) for u in user_ids]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return won, elapsed, latencies
+
+def report(label, buyers, won, elapsed, latencies, stock_left):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label}: {buyers} buyers, {len(won)} holds, stock left {stock_left}, "
+          f"{buyers / elapsed:.0f} req/s, p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buyers', type=int, default=500)
+    parser.add_argument('--stock', type=int, default=5)
+    args = parser.parse_args()
+
+    init_db()
+    for label, stock in (('scarce', args.stock), ('ample', args.buyers)):
+        product_id, user_ids = setup(args.buyers, stock)
+        try:
+            won, elapsed, latencies = run_round(product_id, user_ids)
+            with get_cursor(commit=False) as cur:
+                cur.execute("SELECT stock FROM products WHERE id = %s", (product_id,))
+                stock_left = cur.fetchone()['stock']
+            report(label, args.buyers, won, elapsed, latencies, stock_left)
+            assert len(won) == min(stock, args.buyers), "oversold or undersold"
+            assert stock_left == stock - len(won), "stock counter drifted"
+        finally:
+            teardown(product_id)
+    print("OK: no oversell")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recent-order queries on a plain orders table vs monthly partitions (partitions.py).
+Run: python bench_partitions.py [--per-month 20000] [--months 3,12,36,60]
+Works in a throwaway schema (bench_partitions) that is dropped at the end.
+"""
+import argparse
+import statistics
+import time
+from datetime import date
+from dotenv import load_dotenv
+load_dotenv()
+
+from db import get_cursor
+from partitions import add_months, month_start
+
+SCHEMA = 'bench_partitions'
+QUERIES = {
+    'last 50 (30 days)': """SELECT id, status, total, created_at FROM {table}
+                            WHERE created_at >= LOCALTIMESTAMP - INTERVAL '30 days'
+                            ORDER BY created_at DESC LIMIT 50""",
+    'month stats': """SELECT COUNT(*), SUM(total) FROM {table}
+                      WHERE created_at >= date_trunc('month', LOCALTIMESTAMP)""",
+    'pending this week': """SELECT COUNT(*) FROM {table}
+                            WHERE status = 'pending' AND created_at >= LOCALTIMESTAMP - INTERVAL '7 days'""",
+}
+
+def build(cur, months: int, per_month: int):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    columns = "id INTEGER NOT NULL, status VARCHAR(50), total DECIMAL(10,2), created_at TIMESTAMP NOT NULL"
+    # Today's layout: primary key only.
+    cur.execute(f"CREATE TABLE {SCHEMA}.orders_plain ({columns}, PRIMARY KEY (id))")
+    cur.execute(f"""CREATE TABLE {SCHEMA}.orders_part ({columns}, PRIMARY KEY (id, created_at))
+                    PARTITION BY RANGE (created_at)""")
+    this_month = month_start(date.today())
+    month = add_months(this_month, -months)
+    while month <= add_months(this_month, 1):
+        cur.execute(
+            f"""CREATE TABLE {SCHEMA}.orders_part_y{month.year}m{month.month:02d}
+                PARTITION OF {SCHEMA}.orders_part FOR VALUES FROM (%s) TO (%s)""",
+            (month, add_months(month, 1)),
+        )
+        month = add_months(month, 1)
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.orders_part (created_at)")
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.orders_part (status, created_at)")
+    cur.execute(f"""INSERT INTO {SCHEMA}.orders_plain
+                    SELECT g, (ARRAY['pending','paid','shipped','delivered'])[1 + g % 4], 1000 + g % 9000,
+                           LOCALTIMESTAMP - random() * %s * INTERVAL '30 days'
+                    FROM generate_series(1, %s) g""", (months, months * per_month))
+    cur.execute(f"INSERT INTO {SCHEMA}.orders_part SELECT * FROM {SCHEMA}.orders_plain")
+    cur.execute(f"ANALYZE {SCHEMA}.orders_plain")
+    cur.execute(f"ANALYZE {SCHEMA}.orders_part")
+
+def timed(cur, sql: str, runs=5):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        cur.execute(sql)
+        cur.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--per-month', type=int, default=20000)
+    parser.add_argument('--months', default='3,12,36,60')
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'rows':>10}  {'query':<20} {'plain ms':>10} {'partitioned ms':>15}")
+    try:
+        for months in [int(m) for m in args.months.split(',')]:
+            with get_cursor(commit=True) as cur:
+                build(cur, months, args.per_month)
+            with get_cursor(commit=False) as cur:
+                for label, sql in QUERIES.items():
+                    plain = timed(cur, sql.format(table=f"{SCHEMA}.orders_plain"))
+                    part = timed(cur, sql.format(table=f"{SCHEMA}.orders_part"))
+                    print(f"{months:>6} mo {months * args.per_month:>10}  {label:<20} {plain:>10.2f} {part:>15.2f}")
+    finally:
+        with get_cursor(commit=True) as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import hashlib
+import orjson
+from db import get_cursor
+
+LANGS = ('fr', 'ar')
+
+PRODUCT_COLUMNS = """id, name_fr, name_ar, description_fr, description_ar, price, image_url, category,
+                     options_sizes, options_colors, created_at"""
+
+def _split_options(value):
+    return [x.strip() for x in (value or '').split(',') if x.strip()]
+
+def product_document(row, lang: str) -> dict:
+    """Shape a products row the way the React frontend reads it.
+
+    Stock is left out: every checkout hold changes it, so it is served live by
+    GET /api/products/<id>/stock instead of going stale in the stored bytes.
+    """
+    ar = lang == 'ar'
+    return {
+        'id': row['id'],
+        'name': (row['name_ar'] if ar else None) or row['name_fr'],
+        'description': (row['description_ar'] if ar else None) or row['description_fr'],
+        'price': float(row['price']),
+        'image_url': row['image_url'],
+        'category': row['category'],
+        'options_sizes': _split_options(row['options_sizes']),
+        'options_colors': _split_options(row['options_colors']),
+    }
+
+def encode(obj) -> bytes:
+    return orjson.dumps(obj)
+
+def _store(cur, doc_key: str, lang: str, obj):
+    body = encode(obj)
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    cur.execute(
+        """INSERT INTO product_documents (doc_key, lang, body, etag, updated_at)
+           VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+           ON CONFLICT (doc_key, lang) DO UPDATE
+           SET body = EXCLUDED.body, etag = EXCLUDED.etag, updated_at = CURRENT_TIMESTAMP
+           WHERE product_documents.etag <> EXCLUDED.etag""",
+        (doc_key, lang, body, etag),
+    )
+
+def _list_key(category=None):
+    return f"list:category:{category}" if category else 'list'
+
+def _refresh_lists(cur):
+    cur.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE is_active = TRUE ORDER BY created_at DESC")
+    rows = cur.fetchall()
+    pages = {_list_key(): rows}
+    for r in rows:
+        if r['category']:
+            pages.setdefault(_list_key(r['category']), []).append(r)
+    for lang in LANGS:
+        for key, page_rows in pages.items():
+            _store(cur, key, lang, [product_document(r, lang) for r in page_rows])
+    cur.execute(
+        "DELETE FROM product_documents WHERE doc_key LIKE %s AND NOT (doc_key = ANY(%s))",
+        ('list%', list(pages)),
+    )
+    return rows
+
+def refresh_product(product_id: int):
+    """Regenerate one product's documents and every list page; call after any product write."""
+    with get_cursor(commit=True) as cur:
+        cur.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id = %s AND is_active = TRUE", (product_id,))
+        row = cur.fetchone()
+        if row:
+            for lang in LANGS:
+                _store(cur, f"product:{product_id}", lang, product_document(row, lang))
+        else:
+            cur.execute("DELETE FROM product_documents WHERE doc_key = %s", (f"product:{product_id}",))
+        _refresh_lists(cur)
+
+def rebuild_all():
+    """Regenerate every product and list document (startup, bulk imports)."""
+    with get_cursor(commit=True) as cur:
+        rows = _refresh_lists(cur)
+        for r in rows:
+            for lang in LANGS:
+                _store(cur, f"product:{r['id']}", lang, product_document(r, lang))
+        cur.execute(
+            "DELETE FROM product_documents WHERE doc_key LIKE 'product:%%' AND NOT (doc_key = ANY(%s))",
+            ([f"product:{r['id']}" for r in rows],),
+        )
+
+def get_document(doc_key: str, lang: str):
+    """Return (body_bytes, etag) of a stored document, or None."""
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT body, etag FROM product_documents WHERE doc_key = %s AND lang = %s", (doc_key, lang))
+        row = cur.fetchone()
+    if not row:
+        return None
+    return bytes(row['body']), row['etag']
+
+def get_product(product_id: int, lang: str = 'fr'):
+    return get_document(f"product:{product_id}", lang if lang in LANGS else 'fr')
+
+def get_list(lang: str = 'fr', category: str = None):
+    return get_document(_list_key(category), lang if lang in LANGS else 'fr')
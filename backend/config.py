@@ -7,6 +7,7 @@ class Config:
     SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-secret-change-me')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_ACCESS_TOKEN_EXPIRES = 86400 * 7  # 7 days
+    JWT_TOKEN_LOCATION = ['headers']  # the SSE order stream checks its ?jwt= itself (auth.is_admin_token)
     DATABASE_URL = os.getenv('DATABASE_URL')
     
     # Email - Mailjet
@@ -17,6 +18,31 @@ class Config:
     # Telegram
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     
+    # Inventory holds taken at checkout start
+    RESERVATION_TTL_SECONDS = int(os.getenv('RESERVATION_TTL_SECONDS', 900))
+    RESERVATION_SWEEP_SECONDS = int(os.getenv('RESERVATION_SWEEP_SECONDS', 30))
+    
+    # In-memory discount index refresh interval. The index is per process: an edit clears
+    # it only in the worker that made it, other workers see it within this many seconds
+    # (redemption still re-checks active, window and max uses in the database).
+    DISCOUNT_CACHE_SECONDS = int(os.getenv('DISCOUNT_CACHE_SECONDS', 60))
+    
+    # Email verification: link lifetime, resend throttle, cleanup of never-verified accounts
+    VERIFICATION_TOKEN_TTL_HOURS = int(os.getenv('VERIFICATION_TOKEN_TTL_HOURS', 24))
+    VERIFICATION_RESEND_SECONDS = int(os.getenv('VERIFICATION_RESEND_SECONDS', 60))
+    UNVERIFIED_ACCOUNT_DAYS = int(os.getenv('UNVERIFIED_ACCOUNT_DAYS', 7))
+    VERIFICATION_PURGE_SECONDS = int(os.getenv('VERIFICATION_PURGE_SECONDS', 3600))
+    
+    # Background jobs (scheduler.py); set SCHEDULER_ENABLED=false on nodes that should not run them
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() != 'false'
+    SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 4))
+    SCHEDULER_CHECK_SECONDS = int(os.getenv('SCHEDULER_CHECK_SECONDS', 60))
+    JOB_HISTORY_DAYS = int(os.getenv('JOB_HISTORY_DAYS', 14))
+    CART_SESSION_DAYS = int(os.getenv('CART_SESSION_DAYS', 30))
+    
+    # Restock alerts: warn when forecast stock runs out within this many days
+    RESTOCK_LEAD_DAYS = int(os.getenv('RESTOCK_LEAD_DAYS', 14))
+    
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://dz-clothes00.vercel.app/')
     VERIFY_EMAIL_URL_PATH = '/verify-email'
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '814124596804-o07r8uokfces627sar5l0gk1ihacp1u5.apps.googleusercontent.com')
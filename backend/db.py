@@ -1,26 +1,134 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from contextlib import contextmanager
 import os
+import threading
 from flask_bcrypt import Bcrypt
 
+_pool = None
+_pool_lock = threading.Lock()
+_pinned = threading.local()
+
 def get_connection():
     return psycopg2.connect(
         os.getenv('DATABASE_URL'),
         cursor_factory=RealDictCursor
     )
 
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    1,
+                    int(os.getenv('DB_POOL_MAX', 10)),
+                    os.getenv('DATABASE_URL'),
+                    cursor_factory=RealDictCursor,
+                )
+    return _pool
+
+@contextmanager
+def pinned_connection():
+    """Serve every get_cursor() of this thread from one pooled connection until the block ends."""
+    pool = get_pool()
+    conn = pool.getconn()
+    _pinned.conn = conn
+    try:
+        yield conn
+    finally:
+        _pinned.conn = None
+        conn.rollback()
+        pool.putconn(conn)
+
 @contextmanager
 def get_cursor(commit=False):
-    conn = get_connection()
+    pinned = getattr(_pinned, 'conn', None)
+    conn = pinned or get_connection()
     try:
         cur = conn.cursor()
         yield cur
         if commit:
             conn.commit()
+    except Exception:
+        if pinned:
+            conn.rollback()
+        raise
     finally:
         cur.close()
-        conn.close()
+        if not pinned:
+            conn.close()
+
+ORDERS_DDL = """
+    CREATE TABLE IF NOT EXISTS {orders} (
+        id SERIAL,
+        user_id INTEGER REFERENCES users(id),
+        order_number VARCHAR(50) NOT NULL,
+        status VARCHAR(50) DEFAULT 'pending',
+        total DECIMAL(10,2) NOT NULL,
+        discount_amount DECIMAL(10,2) DEFAULT 0,
+        baridi_phone VARCHAR(50),
+        baridi_reference VARCHAR(255),
+        shipping_address TEXT,
+        email VARCHAR(255),
+        full_name VARCHAR(255),
+        telegram_notified BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, created_at),
+        UNIQUE (order_number, created_at)
+    ) PARTITION BY RANGE (created_at)
+"""
+
+ORDER_ITEMS_DDL = """
+    CREATE TABLE IF NOT EXISTS {order_items} (
+        id SERIAL,
+        order_id INTEGER NOT NULL,
+        product_id INTEGER REFERENCES products(id),
+        product_name_fr VARCHAR(255),
+        product_name_ar VARCHAR(255),
+        price DECIMAL(10,2) NOT NULL,
+        quantity INTEGER NOT NULL,
+        option_size VARCHAR(50),
+        option_color VARCHAR(50),
+        created_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (id, created_at),
+        FOREIGN KEY (order_id, created_at) REFERENCES {orders} (id, created_at) ON DELETE CASCADE
+    ) PARTITION BY RANGE (created_at)
+"""
+
+def create_order_triggers(cur):
+    """NOTIFY order_events on new orders and status changes (live admin feed)."""
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION notify_order_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('order_events', json_build_object(
+                'op', TG_OP,
+                'id', NEW.id,
+                'order_number', NEW.order_number,
+                'status', NEW.status,
+                'old_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+                'total', NEW.total,
+                'email', NEW.email,
+                'full_name', NEW.full_name,
+                'baridi_phone', NEW.baridi_phone,
+                'baridi_reference', NEW.baridi_reference,
+                'created_at', NEW.created_at
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS orders_notify_insert ON orders")
+    cur.execute("""
+        CREATE TRIGGER orders_notify_insert AFTER INSERT ON orders
+        FOR EACH ROW EXECUTE FUNCTION notify_order_event()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS orders_notify_status ON orders")
+    cur.execute("""
+        CREATE TRIGGER orders_notify_status AFTER UPDATE OF status ON orders
+        FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status) EXECUTE FUNCTION notify_order_event()
+    """)
 
 def init_db():
     with get_cursor(commit=True) as cur:
@@ -32,12 +140,35 @@ def init_db():
                 password_hash VARCHAR(255) NOT NULL,
                 full_name VARCHAR(255),
                 is_verified BOOLEAN DEFAULT FALSE,
-                verification_token VARCHAR(255),
                 is_admin BOOLEAN DEFAULT FALSE,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
 
+        # Email verification tokens: SHA-256 of the emailed token, valid until expires_at
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS email_verification_tokens (
+                token_hash BYTEA PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                expires_at TIMESTAMP NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_verification_tokens_user ON email_verification_tokens (user_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_verification_tokens_expiry ON email_verification_tokens (expires_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_users_unverified ON users (created_at) WHERE is_verified = FALSE")
+        # Older databases kept plaintext tokens on users: hash the pending ones, then drop the column
+        cur.execute("""SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'users' AND column_name = 'verification_token'""")
+        if cur.fetchone():
+            cur.execute("""
+                INSERT INTO email_verification_tokens (token_hash, user_id, expires_at)
+                SELECT sha256(convert_to(verification_token, 'UTF8')), id, CURRENT_TIMESTAMP + INTERVAL '24 hours'
+                FROM users WHERE verification_token IS NOT NULL AND is_verified = FALSE
+                ON CONFLICT DO NOTHING
+            """)
+            cur.execute("ALTER TABLE users DROP COLUMN verification_token")
+
         # Products table
         cur.execute("""
             CREATE TABLE IF NOT EXISTS products (
@@ -88,39 +219,161 @@ def init_db():
             )
         """)
 
-        # Orders
+        # Orders and order items, range-partitioned by month (see partitions.py)
+        cur.execute(ORDERS_DDL.format(orders='orders'))
+        cur.execute(ORDER_ITEMS_DDL.format(order_items='order_items', orders='orders'))
+        # Tables created before partitioning: order_items carries the order date from now on
+        cur.execute("ALTER TABLE order_items ADD COLUMN IF NOT EXISTS created_at TIMESTAMP")
+        # Order numbers are unique across all partitions (and archived months) through this table
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
+            CREATE TABLE IF NOT EXISTS order_numbers (
+                order_number VARCHAR(50) PRIMARY KEY,
+                order_id INTEGER,
+                created_at TIMESTAMP
+            )
+        """)
+        cur.execute("""
+            INSERT INTO order_numbers (order_number, order_id, created_at)
+            SELECT order_number, id, created_at FROM orders
+            WHERE NOT EXISTS (SELECT 1 FROM order_numbers)
+            ON CONFLICT DO NOTHING
+        """)
+
+        # Stock reservations (checkout holds and committed order stock)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS stock_reservations (
                 id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id),
-                order_number VARCHAR(50) UNIQUE NOT NULL,
-                status VARCHAR(50) DEFAULT 'pending',
-                total DECIMAL(10,2) NOT NULL,
-                discount_amount DECIMAL(10,2) DEFAULT 0,
-                baridi_phone VARCHAR(50),
-                baridi_reference VARCHAR(255),
-                shipping_address TEXT,
-                email VARCHAR(255),
-                full_name VARCHAR(255),
-                telegram_notified BOOLEAN DEFAULT FALSE,
+                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+                product_id INTEGER REFERENCES products(id) ON DELETE CASCADE,
+                quantity INTEGER NOT NULL,
+                status VARCHAR(20) DEFAULT 'held',
+                order_id INTEGER,
+                expires_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_reservations_user ON stock_reservations (user_id) WHERE status = 'held'")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_reservations_expiry ON stock_reservations (expires_at) WHERE status = 'held'")
 
-        # Order items
+        # Pre-serialized product JSON documents, per language
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS order_items (
+            CREATE TABLE IF NOT EXISTS product_documents (
+                doc_key VARCHAR(255) NOT NULL,
+                lang VARCHAR(5) NOT NULL,
+                body BYTEA NOT NULL,
+                etag VARCHAR(64) NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (doc_key, lang)
+            )
+        """)
+
+        # "Frequently bought together": top-K per product, rebuilt offline by recommendations.py
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS product_recommendations (
+                product_id INTEGER NOT NULL,
+                rank SMALLINT NOT NULL,
+                recommended_id INTEGER NOT NULL,
+                lift REAL NOT NULL,
+                PRIMARY KEY (product_id, rank)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS recommendation_state (
+                id INTEGER PRIMARY KEY,
+                last_order_id INTEGER NOT NULL,
+                order_count INTEGER NOT NULL,
+                cooccurrence BYTEA NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Restock alerts written by forecasting.py; notified_at is set once sent to Telegram
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS restock_alerts (
+                product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+                stock INTEGER NOT NULL,
+                daily_demand REAL NOT NULL,
+                days_remaining REAL NOT NULL,
+                ma7 REAL NOT NULL,
+                ma28 REAL NOT NULL,
+                top_variant VARCHAR(255),
+                notified_at TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Baridi Mob / CCP statement lines already reconciled (see reconciliation.py).
+        # A reference can pay a single order: reuse is caught by the unique index.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS payment_statement_lines (
                 id SERIAL PRIMARY KEY,
-                order_id INTEGER REFERENCES orders(id) ON DELETE CASCADE,
-                product_id INTEGER REFERENCES products(id),
-                product_name_fr VARCHAR(255),
-                product_name_ar VARCHAR(255),
-                price DECIMAL(10,2) NOT NULL,
-                quantity INTEGER NOT NULL,
-                option_size VARCHAR(50),
-                option_color VARCHAR(50)
+                filename VARCHAR(255),
+                line_no INTEGER,
+                reference VARCHAR(255),
+                amount DECIMAL(10,2),
+                phone VARCHAR(20),
+                paid_at VARCHAR(50),
+                order_id INTEGER,
+                match_type VARCHAR(20) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_payment_lines_reference
+                       ON payment_statement_lines (reference) WHERE order_id IS NOT NULL""")
+        # Typo-tolerant matching; reconciliation falls back to exact matches without it
+        cur.execute("SAVEPOINT fuzzystrmatch")
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch")
+        except psycopg2.Error:
+            cur.execute("ROLLBACK TO SAVEPOINT fuzzystrmatch")
+            print("[DB] ⚠️ fuzzystrmatch extension unavailable - fuzzy payment matching disabled")
+
+        # Scheduler: one row per job (shared schedule across nodes) and the run history
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                name VARCHAR(100) PRIMARY KEY,
+                interval_seconds INTEGER NOT NULL,
+                next_run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                last_started_at TIMESTAMP,
+                last_finished_at TIMESTAMP,
+                last_duration_ms INTEGER,
+                last_status VARCHAR(20),
+                last_error TEXT,
+                running_on VARCHAR(255),
+                run_count INTEGER NOT NULL DEFAULT 0,
+                failure_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS job_runs (
+                id SERIAL PRIMARY KEY,
+                job_name VARCHAR(100) NOT NULL,
+                node VARCHAR(255) NOT NULL,
+                started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP,
+                duration_ms INTEGER,
+                status VARCHAR(20) NOT NULL DEFAULT 'running',
+                error TEXT
             )
         """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_started_at ON job_runs (started_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_running ON job_runs (job_name) WHERE status = 'running'")
+        # One-shot data migrations, each recorded once it has run
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name VARCHAR(100) PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Orders placed before telegram_notified was tracked were alerted at checkout (or never
+        # will be): mark them once so the resend job skips them.
+        cur.execute("""INSERT INTO schema_migrations (name) VALUES ('telegram_notified_backfill')
+                       ON CONFLICT DO NOTHING RETURNING name""")
+        if cur.fetchone():
+            cur.execute("UPDATE orders SET telegram_notified = TRUE WHERE telegram_notified IS NOT TRUE")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_cart_items_guest ON cart_items (created_at) WHERE user_id IS NULL")
+
+        create_order_triggers(cur)
 
         # Admin settings
         cur.execute("""
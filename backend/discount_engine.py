@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import datetime
+from db import get_cursor
+from config import Config
+
+class DiscountUnavailable(Exception):
+    """Raised inside the order transaction when a code can no longer be redeemed."""
+
+_lock = threading.Lock()
+_index = {}
+_loaded_at = 0.0
+
+def _key(code: str) -> str:
+    return (code or '').strip().casefold()
+
+def _load():
+    """Build the case-folded code -> discount index from active discounts."""
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT id, code, percent_off, amount_off, min_purchase, max_uses, used_count, valid_from, valid_until
+                       FROM discounts WHERE is_active = TRUE""")
+        rows = cur.fetchall()
+    index = {}
+    for r in rows:
+        index[_key(r['code'])] = {
+            'id': r['id'],
+            'code': r['code'],
+            'percent_off': float(r['percent_off'] or 0),
+            'amount_off': float(r['amount_off'] or 0),
+            'min_purchase': float(r['min_purchase'] or 0),
+            'max_uses': r['max_uses'],
+            'used_count': r['used_count'] or 0,
+            'valid_from': r['valid_from'],
+            'valid_until': r['valid_until'],
+        }
+    return index
+
+def _current_index():
+    global _index, _loaded_at
+    if time.monotonic() - _loaded_at < Config.DISCOUNT_CACHE_SECONDS:
+        return _index
+    with _lock:
+        if time.monotonic() - _loaded_at >= Config.DISCOUNT_CACHE_SECONDS:
+            _index = _load()
+            _loaded_at = time.monotonic()
+    return _index
+
+def invalidate():
+    """Drop this process's cached index; call after creating, editing or deleting a discount.
+    Other workers pick the change up within DISCOUNT_CACHE_SECONDS."""
+    global _loaded_at
+    _loaded_at = 0.0
+
+def evaluate(code: str, subtotal: float, now=None):
+    """Check a code against the cached index. Returns (result_dict, error)."""
+    d = _current_index().get(_key(code))
+    if not d:
+        return None, 'Code invalide'
+    now = now or datetime.now()
+    if d['valid_from'] and now < d['valid_from']:
+        return None, "Code pas encore valide"
+    if d['valid_until'] and now > d['valid_until']:
+        return None, 'Code expiré'
+    if d['max_uses'] is not None and d['used_count'] >= d['max_uses']:
+        return None, 'Code épuisé'
+    if subtotal < d['min_purchase']:
+        return None, f"Montant minimum de {d['min_purchase']:.0f} DA requis"
+    amount = subtotal * d['percent_off'] / 100 if d['percent_off'] else 0.0
+    amount = min(max(amount, d['amount_off']), subtotal)
+    amount = round(amount, 2)
+    return {'id': d['id'], 'code': d['code'], 'discount_amount': amount, 'total': round(subtotal - amount, 2)}, None
+
+def redeem(cur, discount: dict, now=None):
+    """Atomically count one use inside the order transaction; raises DiscountUnavailable if exhausted.
+
+    The validity window is checked against the same app-server clock as evaluate(),
+    so a code that previewed as valid is not rejected because the database clock differs.
+    """
+    now = now or datetime.now()
+    cur.execute(
+        """UPDATE discounts SET used_count = COALESCE(used_count, 0) + 1
+           WHERE id = %s AND is_active = TRUE
+             AND (max_uses IS NULL OR COALESCE(used_count, 0) < max_uses)
+             AND (valid_from IS NULL OR valid_from <= %s)
+             AND (valid_until IS NULL OR valid_until >= %s)
+           RETURNING used_count""",
+        (discount['id'], now, now),
+    )
+    row = cur.fetchone()
+    if row is None:
+        invalidate()
+        raise DiscountUnavailable(discount['code'])
+    cached = _index.get(_key(discount['code']))
+    if cached:
+        cached['used_count'] = row['used_count']
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Sales forecasting and restock alerts, computed for every SKU variant at once.
+Run: python forecasting.py [--days 56] [--lead-days 14] [--no-notify]
+Loads daily sales per (product, size, color) into one NumPy matrix, smooths them,
+compares the forecast demand with products.stock and sends new alerts to Telegram
+as one digest.
+"""
+import argparse
+import time
+import numpy as np
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+load_dotenv()
+
+from config import Config
+from db import get_connection, get_cursor
+from telegram_service import send_telegram_notification
+
+HISTORY_DAYS = 56
+ALPHA = 0.3
+DIGEST_LINES = 40  # keeps the digest under Telegram's 4096-character limit
+
+def load_sales(days: int):
+    """Return (variant product ids, sizes, colors, sales matrix [variant x day, oldest first])."""
+    conn = get_connection()
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        cur.execute("""
+            WITH daily AS (
+                SELECT i.product_id, COALESCE(i.option_size, '') AS size, COALESCE(i.option_color, '') AS color,
+                       CURRENT_DATE - o.created_at::date AS age, SUM(i.quantity) AS qty
+                FROM order_items i JOIN orders o ON o.id = i.order_id
+                WHERE o.created_at >= CURRENT_DATE - %s AND o.created_at < CURRENT_DATE
+                  AND o.status <> 'cancelled' AND i.product_id IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            )
+            SELECT DENSE_RANK() OVER (ORDER BY product_id, size, color) - 1, product_id, size, color, age, qty
+            FROM daily""", (days,))
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0, dtype=object), np.zeros((0, days))
+    variant, product_id, size, color, age, qty = (np.array(col) for col in zip(*rows))
+    variant = variant.astype(np.int64)
+    sales = np.zeros((variant.max() + 1, days))
+    sales[variant, days - age.astype(np.int64)] = qty.astype(np.float64)
+    _, first = np.unique(variant, return_index=True)
+    return product_id[first].astype(np.int64), size[first].astype(object), color[first].astype(object), sales
+
+def smooth(sales, alpha=ALPHA):
+    """Simple exponential smoothing of every row, as one matrix-vector product."""
+    n = sales.shape[1]
+    if n == 0:
+        return np.zeros(sales.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (n - 1)  # the series starts at its first value
+    return sales @ weights
+
+def forecast(variant_products, sales, product_ids, stock, alpha=ALPHA):
+    """Per-product daily demand, 7/28-day moving averages and days of stock remaining."""
+    level = smooth(sales, alpha)
+    ma7 = sales[:, -7:].mean(axis=1)
+    ma28 = sales[:, -28:].mean(axis=1)
+
+    # Variants of inactive or deleted products have no row in product_ids.
+    pos = np.searchsorted(product_ids, variant_products)
+    known = pos < len(product_ids)
+    known[known] = product_ids[pos[known]] == variant_products[known]
+    pos, n = pos[known], len(product_ids)
+    demand = np.bincount(pos, weights=level[known], minlength=n)
+    days_left = np.divide(stock, demand, out=np.full(n, np.inf), where=demand > 0)
+
+    # Best-selling variant of each product, for the digest.
+    order = np.lexsort((-level[known], pos))
+    first = order[np.r_[True, pos[order][1:] != pos[order][:-1]]] if len(order) else order
+    top_variant = np.full(n, -1)
+    top_variant[pos[first]] = np.flatnonzero(known)[first]
+
+    return {
+        'demand': demand,
+        'ma7': np.bincount(pos, weights=ma7[known], minlength=n),
+        'ma28': np.bincount(pos, weights=ma28[known], minlength=n),
+        'days_left': days_left,
+        'top_variant': top_variant,
+    }
+
+def _variant_label(size, color) -> str:
+    return ' / '.join(v for v in (size, color) if v)
+
+def write_alerts(products, result, sizes, colors, lead_days: int):
+    """Replace restock_alerts with products whose stock runs out within lead_days."""
+    hits = np.flatnonzero((result['demand'] > 0) & (result['days_left'] < lead_days))
+    rows = []
+    for i in hits[np.argsort(result['days_left'][hits])]:
+        v = result['top_variant'][i]
+        rows.append((int(products['id'][i]), int(products['stock'][i]), float(result['demand'][i]),
+                     float(result['days_left'][i]), float(result['ma7'][i]), float(result['ma28'][i]),
+                     _variant_label(sizes[v], colors[v]) if v >= 0 else ''))
+
+    with get_cursor(commit=True) as cur:
+        cur.execute("DELETE FROM restock_alerts WHERE product_id <> ALL(%s)", ([r[0] for r in rows],))
+        if rows:
+            # An alert that is still open keeps its notified_at, so it is not sent twice.
+            execute_values(cur, """INSERT INTO restock_alerts (product_id, stock, daily_demand, days_remaining, ma7, ma28, top_variant)
+                                   VALUES %s
+                                   ON CONFLICT (product_id) DO UPDATE SET stock = EXCLUDED.stock, daily_demand = EXCLUDED.daily_demand,
+                                       days_remaining = EXCLUDED.days_remaining, ma7 = EXCLUDED.ma7, ma28 = EXCLUDED.ma28,
+                                       top_variant = EXCLUDED.top_variant, updated_at = CURRENT_TIMESTAMP""", rows, page_size=1000)
+    return len(rows)
+
+def send_digest():
+    """Send every alert not yet notified as one Telegram message."""
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT a.product_id, p.name_fr, a.stock, a.daily_demand, a.days_remaining, a.ma7, a.ma28, a.top_variant
+                       FROM restock_alerts a JOIN products p ON p.id = a.product_id
+                       WHERE a.notified_at IS NULL ORDER BY a.days_remaining""")
+        alerts = cur.fetchall()
+    if not alerts:
+        return False
+
+    lines = []
+    for a in alerts[:DIGEST_LINES]:
+        trend = '↗' if a['ma7'] > a['ma28'] else '↘' if a['ma7'] < a['ma28'] else '→'
+        variant = f" — surtout {a['top_variant']}" if a['top_variant'] else ''
+        lines.append(f"- {a['name_fr']}: {a['stock']} en stock, ~{a['daily_demand']:.1f}/jour {trend}, "
+                     f"<b>{a['days_remaining']:.0f} j</b>{variant}")
+    if len(alerts) > DIGEST_LINES:
+        lines.append(f"… et {len(alerts) - DIGEST_LINES} autres")
+    msg = f"📦 <b>Réapprovisionnement DZ Clothes</b>\n{len(alerts)} produit(s) bientôt en rupture:\n" + '\n'.join(lines)
+
+    if not send_telegram_notification(msg):
+        return False
+    with get_cursor(commit=True) as cur:
+        cur.execute("UPDATE restock_alerts SET notified_at = CURRENT_TIMESTAMP WHERE product_id = ANY(%s)",
+                    ([a['product_id'] for a in alerts],))
+    return True
+
+def run(days=HISTORY_DAYS, lead_days=None, notify=True):
+    """Recompute forecasts for every SKU and refresh restock alerts."""
+    lead_days = lead_days or Config.RESTOCK_LEAD_DAYS
+    t0 = time.perf_counter()
+    variant_products, sizes, colors, sales = load_sales(days)
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT id, stock FROM products WHERE is_active = TRUE ORDER BY id")
+        rows = cur.fetchall()
+    products = {
+        'id': np.array([r['id'] for r in rows], dtype=np.int64),
+        'stock': np.array([r['stock'] or 0 for r in rows], dtype=np.float64),
+    }
+    result = forecast(variant_products, sales, products['id'], products['stock'])
+    count = write_alerts(products, result, sizes, colors, lead_days)
+    print(f"[Forecast] ✅ {len(variant_products)} variants, {count} restock alerts, {time.perf_counter() - t0:.1f}s")
+    if notify:
+        send_digest()
+    return count
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=HISTORY_DAYS)
+    parser.add_argument('--lead-days', type=int, default=None)
+    parser.add_argument('--no-notify', action='store_true')
+    args = parser.parse_args()
+    run(days=args.days, lead_days=args.lead_days, notify=not args.no_notify)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from collections import defaultdict
+from db import get_cursor
+from config import Config
+
+# First key of pg_advisory_xact_lock(int, int) for per-user hold changes; the user id is the second
+HOLD_LOCK_NAMESPACE = 0x686F
+
+class OutOfStock(Exception):
+    """Raised inside a transaction when a product cannot cover the requested quantity."""
+    def __init__(self, product_id):
+        super().__init__(product_id)
+        self.product_id = product_id
+
+def _wanted_quantities(items):
+    """Sum cart quantities per product (sizes/colours share the product stock)."""
+    wanted = defaultdict(int)
+    for r in items:
+        wanted[int(r['product_id'])] += int(r['quantity'])
+    return wanted
+
+def _sync_holds(cur, user_id, items):
+    """Move stock between `products` and the user's current holds so they match `items`.
+
+    Only the difference is applied, one conditional UPDATE per product, in product id
+    order so concurrent checkouts always lock rows in the same order. Changes for one
+    user are serialized: with no held rows yet, FOR UPDATE alone would lock nothing.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (HOLD_LOCK_NAMESPACE, user_id))
+    cur.execute(
+        """SELECT id, product_id, quantity FROM stock_reservations
+           WHERE user_id = %s AND status = 'held' FOR UPDATE""",
+        (user_id,),
+    )
+    rows = cur.fetchall()
+    held = _wanted_quantities(rows)
+    wanted = _wanted_quantities(items)
+
+    for product_id in sorted(set(held) | set(wanted)):
+        delta = wanted.get(product_id, 0) - held.get(product_id, 0)
+        if delta > 0:
+            cur.execute(
+                "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s RETURNING id",
+                (delta, product_id, delta),
+            )
+            if cur.fetchone() is None:
+                raise OutOfStock(product_id)
+        elif delta < 0:
+            cur.execute("UPDATE products SET stock = stock + %s WHERE id = %s", (-delta, product_id))
+
+    if rows:
+        cur.execute("DELETE FROM stock_reservations WHERE id = ANY(%s)", ([r['id'] for r in rows],))
+    return wanted
+
+def hold_cart(user_id, items, ttl=None):
+    """Reserve stock for a cart at checkout start. Returns the product id that ran out, or None."""
+    ttl = ttl or Config.RESERVATION_TTL_SECONDS
+    try:
+        with get_cursor(commit=True) as cur:
+            wanted = _sync_holds(cur, user_id, items)
+            for product_id, quantity in wanted.items():
+                cur.execute(
+                    """INSERT INTO stock_reservations (user_id, product_id, quantity, status, expires_at)
+                       VALUES (%s, %s, %s, 'held', CURRENT_TIMESTAMP + %s * INTERVAL '1 second')""",
+                    (user_id, product_id, quantity, ttl),
+                )
+    except OutOfStock as e:
+        return e.product_id
+    return None
+
+def commit_holds(cur, user_id, items, order_id):
+    """Turn the user's holds into committed reservations for `order_id`.
+
+    Runs inside the order transaction. Expired or missing holds are re-acquired on the
+    spot; raises OutOfStock if that is no longer possible so the order rolls back.
+    """
+    wanted = _sync_holds(cur, user_id, items)
+    for product_id, quantity in wanted.items():
+        cur.execute(
+            """INSERT INTO stock_reservations (user_id, product_id, quantity, status, order_id)
+               VALUES (%s, %s, %s, 'committed', %s)""",
+            (user_id, product_id, quantity, order_id),
+        )
+
+def set_order_cancelled(cur, order_id, cancelled: bool):
+    """Return a cancelled order's committed stock to products, or take it out again when
+    the order is un-cancelled. Runs inside the status-change transaction; raises
+    OutOfStock if un-cancelling needs more stock than is left."""
+    old, new = ('committed', 'cancelled') if cancelled else ('cancelled', 'committed')
+    cur.execute(
+        "UPDATE stock_reservations SET status = %s WHERE order_id = %s AND status = %s RETURNING product_id, quantity",
+        (new, order_id, old),
+    )
+    quantities = _wanted_quantities(cur.fetchall())
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        if cancelled:
+            cur.execute("UPDATE products SET stock = stock + %s WHERE id = %s", (quantity, product_id))
+        else:
+            cur.execute(
+                "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s RETURNING id",
+                (quantity, product_id, quantity),
+            )
+            if cur.fetchone() is None:
+                raise OutOfStock(product_id)
+    return quantities
+
+def held_quantity(cur, product_id) -> int:
+    """Units of a product currently held by checkouts (already taken out of products.stock)."""
+    cur.execute(
+        "SELECT COALESCE(SUM(quantity), 0) AS held FROM stock_reservations WHERE product_id = %s AND status = 'held'",
+        (product_id,),
+    )
+    return int(cur.fetchone()['held'])
+
+def release_expired(batch_size=500):
+    """Return stock of expired holds to products. Safe to run from several workers at once."""
+    released = 0
+    while True:
+        with get_cursor(commit=True) as cur:
+            cur.execute(
+                """DELETE FROM stock_reservations WHERE id IN (
+                       SELECT id FROM stock_reservations
+                       WHERE status = 'held' AND expires_at < CURRENT_TIMESTAMP
+                       ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+                   ) RETURNING product_id, quantity""",
+                (batch_size,),
+            )
+            rows = cur.fetchall()
+            freed = _wanted_quantities(rows)
+            for product_id in sorted(freed):
+                cur.execute("UPDATE products SET stock = stock + %s WHERE id = %s", (freed[product_id], product_id))
+        released += len(rows)
+        if len(rows) < batch_size:
+            return released
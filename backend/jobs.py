@@ -0,0 +1,62 @@
+"""
+Recurring maintenance jobs, registered with the scheduler at startup.
+"""
+from db import get_cursor
+from config import Config
+from telegram_service import notify_new_order, items_summary
+from inventory import release_expired
+from auth import purge_unverified
+import catalog
+import forecasting
+import partitions
+import recommendations
+import scheduler
+
+def clear_stale_carts(batch_size=1000):
+    """Delete guest cart rows (session only, no user) older than CART_SESSION_DAYS."""
+    deleted = 0
+    while True:
+        with get_cursor(commit=True) as cur:
+            cur.execute("""DELETE FROM cart_items WHERE id IN (
+                               SELECT id FROM cart_items
+                               WHERE user_id IS NULL AND created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+                               ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+                           )""", (Config.CART_SESSION_DAYS, batch_size))
+            n = cur.rowcount
+        deleted += n
+        if n < batch_size:
+            return deleted
+
+def resend_order_notifications(limit=20):
+    """Send Telegram notifications that failed at checkout (telegram_notified = FALSE)."""
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT id, created_at, order_number, total, email FROM orders
+                       WHERE telegram_notified = FALSE
+                         AND created_at > CURRENT_TIMESTAMP - INTERVAL '2 days'
+                         AND created_at < CURRENT_TIMESTAMP - INTERVAL '1 minute'
+                       ORDER BY created_at LIMIT %s""", (limit,))
+        orders = cur.fetchall()
+    sent = 0
+    for o in orders:
+        with get_cursor(commit=False) as cur:
+            cur.execute("""SELECT product_name_fr AS name_fr, price, quantity FROM order_items
+                           WHERE order_id = %s ORDER BY id""", (o['id'],))
+            items = cur.fetchall()
+        if not notify_new_order(o['order_number'], float(o['total']), o['email'], items_summary(items)):
+            break  # Telegram unreachable or not configured: try again next run
+        with get_cursor(commit=True) as cur:
+            cur.execute("UPDATE orders SET telegram_notified = TRUE WHERE id = %s AND created_at = %s",
+                        (o['id'], o['created_at']))
+        sent += 1
+    return sent
+
+def register_default_jobs():
+    scheduler.register('release_expired_holds', Config.RESERVATION_SWEEP_SECONDS, release_expired)
+    scheduler.register('resend_order_notifications', 300, resend_order_notifications)
+    scheduler.register('clear_stale_carts', 3600, clear_stale_carts)
+    scheduler.register('purge_unverified_accounts', Config.VERIFICATION_PURGE_SECONDS, purge_unverified)
+    scheduler.register('refresh_product_documents', 900, catalog.rebuild_all)
+    scheduler.register('ensure_partitions', 86400, lambda: partitions.ensure_partitions(raise_errors=True))
+    scheduler.register('recommendations', 3600, recommendations.run)
+    scheduler.register('restock_forecast', 86400, forecasting.run)
+    scheduler.register('prune_job_runs', 86400, scheduler.prune_runs)
@@ -0,0 +1,72 @@
+import os
+import queue
+import select
+import threading
+import time
+import psycopg2
+
+CHANNEL = 'order_events'
+HEARTBEAT_SECONDS = 15
+CLIENT_QUEUE_SIZE = 32
+
+_subscribers = set()
+_lock = threading.Lock()
+_listener = None
+
+def _broadcast(frame: bytes):
+    with _lock:
+        targets = list(_subscribers)
+    for q in targets:
+        try:
+            q.put_nowait(frame)
+        except queue.Full:
+            # Slow client: drop the event rather than buffer without bound.
+            pass
+
+def _listen_loop():
+    """Hold one LISTEN connection for the whole process and fan NOTIFY payloads out."""
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            print("[Orders] Listening for order events")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    n = conn.notifies.pop(0)
+                    # Encode the SSE frame once; every client gets the same bytes object.
+                    _broadcast(f"event: order\ndata: {n.payload}\n\n".encode('utf-8'))
+        except Exception as e:
+            print(f"[Orders] ❌ Listener error: {str(e)}")
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+def _ensure_listener():
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen_loop, name='order-events', daemon=True)
+            _listener.start()
+
+def stream():
+    """Server-Sent Events generator for one admin client."""
+    _ensure_listener()
+    q = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    with _lock:
+        _subscribers.add(q)
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                yield q.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield b": ping\n\n"
+    finally:
+        with _lock:
+            _subscribers.discard(q)
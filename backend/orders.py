@@ -0,0 +1,84 @@
+import os
+from db import get_cursor
+from inventory import OutOfStock, commit_holds
+from telegram_service import notify_new_order, items_summary
+import discount_engine
+
+ORDER_FIELDS = ('email', 'full_name', 'shipping_address', 'baridi_phone', 'baridi_reference')
+ORDER_NUMBER_ATTEMPTS = 5
+
+def _reserve_order_number(cur):
+    """Claim a random order number in order_numbers, the global uniqueness guard
+    (orders is partitioned, so its own unique key also includes created_at)."""
+    for _ in range(ORDER_NUMBER_ATTEMPTS):
+        order_number = f"DZ-{os.urandom(4).hex().upper()}"
+        cur.execute("INSERT INTO order_numbers (order_number) VALUES (%s) ON CONFLICT DO NOTHING RETURNING order_number",
+                    (order_number,))
+        if cur.fetchone():
+            return order_number
+    raise RuntimeError('Could not allocate a unique order number')
+
+def place_order(user_id: int, data: dict):
+    """Turn the user's cart into a pending order. Returns (result_dict, error)."""
+    fields = {k: (data.get(k) or '').strip() for k in ORDER_FIELDS}
+    discount_code = (data.get('discount_code') or '').strip()
+    if not all(fields.values()):
+        return None, 'Tous les champs sont requis'
+
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT c.id, c.product_id, c.quantity, c.option_size, c.option_color, p.name_fr, p.name_ar, p.price, p.stock
+                       FROM cart_items c JOIN products p ON p.id = c.product_id WHERE c.user_id = %s""", (user_id,))
+        items = cur.fetchall()
+
+    if not items:
+        return None, 'Panier vide'
+
+    subtotal = sum(float(r['price']) * r['quantity'] for r in items)
+    discount_amount = 0.0
+    discount = None
+
+    if discount_code:
+        discount, err = discount_engine.evaluate(discount_code, subtotal)
+        if err:
+            return None, err
+        discount_amount = discount['discount_amount']
+
+    total = round(subtotal - discount_amount, 2)
+
+    try:
+        with get_cursor(commit=True) as cur:
+            order_number = _reserve_order_number(cur)
+            cur.execute("""INSERT INTO orders (user_id, order_number, status, total, discount_amount, baridi_phone, baridi_reference, shipping_address, email, full_name)
+                           VALUES (%s, %s, 'pending', %s, %s, %s, %s, %s, %s, %s) RETURNING id, created_at""",
+                        (user_id, order_number, total, discount_amount, fields['baridi_phone'], fields['baridi_reference'],
+                         fields['shipping_address'], fields['email'], fields['full_name']))
+            order = cur.fetchone()
+            order_id = order['id']
+            cur.execute("UPDATE order_numbers SET order_id = %s, created_at = %s WHERE order_number = %s",
+                        (order_id, order['created_at'], order_number))
+
+            for r in items:
+                cur.execute("""INSERT INTO order_items (order_id, product_id, product_name_fr, product_name_ar, price, quantity, option_size, option_color, created_at)
+                               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                            (order_id, r['product_id'], r['name_fr'], r['name_ar'], r['price'], r['quantity'], r.get('option_size'), r.get('option_color'),
+                             order['created_at']))
+
+            commit_holds(cur, user_id, items, order_id)
+
+            if discount and discount_amount > 0:
+                discount_engine.redeem(cur, discount)
+
+            cur.execute("DELETE FROM cart_items WHERE user_id = %s", (user_id,))
+    except OutOfStock as e:
+        name = next(r['name_fr'] for r in items if r['product_id'] == e.product_id)
+        return None, f'Stock insuffisant pour {name}'
+    except discount_engine.DiscountUnavailable:
+        return None, 'Code promo épuisé ou expiré'
+
+    # Unsent notifications are retried by the resend_order_notifications job
+    if notify_new_order(order_number, total, fields['email'], items_summary(items)):
+        with get_cursor(commit=True) as cur:
+            cur.execute("UPDATE orders SET telegram_notified = TRUE WHERE id = %s AND created_at = %s",
+                        (order_id, order['created_at']))
+
+    return {'order_id': order_id, 'order_number': order_number, 'total': total, 'discount_amount': discount_amount}, None
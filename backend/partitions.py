@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Monthly range partitions for orders and order_items.
+Run: python partitions.py ensure                  # create upcoming monthly partitions
+     python partitions.py migrate                 # convert plain tables, in small batches
+     python partitions.py archive --before 2024-01 [--dir archive]
+     python partitions.py restore archive/orders_y2023m01.csv.gz
+"""
+import argparse
+import gzip
+import os
+import re
+from datetime import date
+from dotenv import load_dotenv
+load_dotenv()
+
+from db import get_cursor, create_order_triggers, ORDERS_DDL, ORDER_ITEMS_DDL
+
+# order_items references orders, so orders partitions are created first and detached last.
+TABLES = ('orders', 'order_items')
+ORDER_COLUMNS = """id, user_id, order_number, status, total, discount_amount, baridi_phone, baridi_reference,
+                   shipping_address, email, full_name, telegram_notified, created_at"""
+ITEM_COLUMNS = """id, order_id, product_id, product_name_fr, product_name_ar, price, quantity,
+                  option_size, option_color"""
+PARTITION_RE = re.compile(r'^(orders|order_items)_y(\d{4})m(\d{2})$')
+
+def month_start(d) -> date:
+    return date(d.year, d.month, 1)
+
+def add_months(d: date, n: int) -> date:
+    m = d.year * 12 + d.month - 1 + n
+    return date(m // 12, m % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row) and row['relkind'] == 'p'
+
+def create_indexes(cur, suffix=''):
+    """Secondary indexes for admin lists, stats and exports; defined on the parent, built per partition.
+
+    Index names ignore `suffix` so indexes built on orders_p during a migration keep
+    their final names after the swap.
+    """
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders{suffix} (created_at)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders{suffix} (status, created_at)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders{suffix} (user_id)")
+    cur.execute(f"""CREATE INDEX IF NOT EXISTS idx_orders_telegram_pending ON orders{suffix} (created_at)
+                    WHERE telegram_notified = FALSE""")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items{suffix} (order_id)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items{suffix} (product_id)")
+
+def _create_partitions(cur, first: date, last: date, suffix=''):
+    """Create monthly partitions from `first` to `last` (inclusive) plus a default catch-all."""
+    for table in TABLES:
+        parent = f"{table}{suffix}"
+        month = first
+        while month <= last:
+            cur.execute(
+                f"""CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {parent}
+                    FOR VALUES FROM (%s) TO (%s)""",
+                (month, add_months(month, 1)),
+            )
+            month = add_months(month, 1)
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {parent} DEFAULT")
+
+def ensure_partitions(months_ahead=3, raise_errors=False):
+    """Keep partitions ready for the current month and the next `months_ahead`.
+
+    Errors are logged and reported as False at startup; the scheduled job passes
+    raise_errors=True so the failure is recorded in job_runs.
+    """
+    try:
+        with get_cursor(commit=True) as cur:
+            if not is_partitioned(cur, 'orders'):
+                print("[Partitions] orders is not partitioned yet - run: python partitions.py migrate")
+                return False
+            this_month = month_start(date.today())
+            _create_partitions(cur, this_month, add_months(this_month, months_ahead))
+            create_indexes(cur)
+    except Exception as e:
+        # Typically rows for a new month already landed in the default partition.
+        print(f"[Partitions] ❌ Could not create partitions: {str(e)}")
+        if raise_errors:
+            raise
+        return False
+    return True
+
+def _copy_orders(cur, where: str, params):
+    """Copy orders matching `where` (with an {id} placeholder) and their items into the *_p tables."""
+    cur.execute(f"""INSERT INTO orders_p ({ORDER_COLUMNS})
+                    SELECT {ORDER_COLUMNS.replace('created_at', "COALESCE(created_at, TIMESTAMP '2000-01-01')")}
+                    FROM orders WHERE {where.format(id='id')}""", params)
+    cur.execute(f"""INSERT INTO order_items_p ({ITEM_COLUMNS}, created_at)
+                    SELECT {', '.join('i.' + c.strip() for c in ITEM_COLUMNS.split(','))},
+                           COALESCE(o.created_at, TIMESTAMP '2000-01-01')
+                    FROM order_items i JOIN orders o ON o.id = i.order_id WHERE {where.format(id='o.id')}""", params)
+
+def migrate(batch_size=5000):
+    """Convert plain orders/order_items into partitioned tables without a long lock.
+
+    1. Changed order ids are logged by a temporary trigger while rows are copied.
+    2. Existing rows are copied into orders_p/order_items_p in id batches, one commit each.
+    3. A short final transaction blocks writes, copies the tail, replays logged
+       changes and swaps the tables. The old tables stay as *_legacy for checking.
+    """
+    with get_cursor(commit=True) as cur:
+        if is_partitioned(cur, 'orders'):
+            print("[Partitions] orders is already partitioned")
+            return
+        cur.execute("CREATE TABLE IF NOT EXISTS orders_migration_log (order_id INTEGER NOT NULL)")
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION log_order_migration() RETURNS trigger AS $$
+            BEGIN
+                IF TG_TABLE_NAME = 'orders' THEN
+                    INSERT INTO orders_migration_log VALUES (OLD.id);
+                ELSIF TG_OP = 'DELETE' THEN
+                    INSERT INTO orders_migration_log VALUES (OLD.order_id);
+                ELSE
+                    INSERT INTO orders_migration_log VALUES (NEW.order_id);
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS orders_migration_log ON orders")
+        cur.execute("""CREATE TRIGGER orders_migration_log AFTER UPDATE OR DELETE ON orders
+                       FOR EACH ROW EXECUTE FUNCTION log_order_migration()""")
+        cur.execute("DROP TRIGGER IF EXISTS order_items_migration_log ON order_items")
+        cur.execute("""CREATE TRIGGER order_items_migration_log AFTER INSERT OR UPDATE OR DELETE ON order_items
+                       FOR EACH ROW EXECUTE FUNCTION log_order_migration()""")
+
+        cur.execute("DROP TABLE IF EXISTS order_items_p")
+        cur.execute("DROP TABLE IF EXISTS orders_p")
+        cur.execute(ORDERS_DDL.format(orders='orders_p'))
+        cur.execute(ORDER_ITEMS_DDL.format(order_items='order_items_p', orders='orders_p'))
+        cur.execute("SELECT MIN(created_at) AS first, COALESCE(MAX(id), 0) AS high FROM orders")
+        row = cur.fetchone()
+        first = month_start(row['first'] or date.today())
+        high = row['high']
+        this_month = month_start(date.today())
+        _create_partitions(cur, first, add_months(this_month, 3), suffix='_p')
+
+    copied = 0
+    while copied < high:
+        with get_cursor(commit=True) as cur:
+            _copy_orders(cur, "{id} > %s AND {id} <= %s", (copied, copied + batch_size))
+        copied = min(copied + batch_size, high)
+        print(f"[Partitions] Copied orders up to id {copied}/{high}")
+
+    # Build indexes before taking the lock so the swap itself stays short.
+    with get_cursor(commit=True) as cur:
+        create_indexes(cur, suffix='_p')
+
+    with get_cursor(commit=True) as cur:
+        cur.execute("LOCK TABLE orders, order_items IN EXCLUSIVE MODE")
+        _copy_orders(cur, "{id} > %s", (high,))
+        cur.execute("SELECT DISTINCT order_id FROM orders_migration_log")
+        changed = [r['order_id'] for r in cur.fetchall()]
+        if changed:
+            cur.execute("DELETE FROM orders_p WHERE id = ANY(%s)", (changed,))
+            _copy_orders(cur, "{id} = ANY(%s)", (changed,))
+
+        cur.execute("DROP TRIGGER orders_migration_log ON orders")
+        cur.execute("DROP TRIGGER order_items_migration_log ON order_items")
+        cur.execute("DROP TABLE orders_migration_log")
+        cur.execute("DROP FUNCTION log_order_migration()")
+        cur.execute("ALTER TABLE stock_reservations DROP CONSTRAINT IF EXISTS stock_reservations_order_id_fkey")
+
+        for table in TABLES:
+            cur.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+            cur.execute(f"ALTER TABLE {table}_p RENAME TO {table}")
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+            cur.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+            cur.execute(f"DROP SEQUENCE {table}_p_id_seq")
+        cur.execute("DROP TRIGGER IF EXISTS orders_notify_insert ON orders_legacy")
+        cur.execute("DROP TRIGGER IF EXISTS orders_notify_status ON orders_legacy")
+        create_order_triggers(cur)
+    print(f"[Partitions] ✅ Migrated {high} orders ({len(changed)} replayed). "
+          f"Drop orders_legacy and order_items_legacy once checked.")
+
+def _dump(cur, table: str, path: str):
+    with gzip.open(path, 'wb') as f:
+        cur.copy_expert(f"COPY {table} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+
+def archive(before: date, directory='archive'):
+    """Detach monthly partitions older than `before`, dump them to .csv.gz and drop them."""
+    os.makedirs(directory, exist_ok=True)
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT c.relname FROM pg_inherits i
+                       JOIN pg_class c ON c.oid = i.inhrelid
+                       WHERE i.inhparent = 'orders'::regclass ORDER BY c.relname""")
+        names = [r['relname'] for r in cur.fetchall()]
+    months = []
+    for name in names:
+        m = PARTITION_RE.match(name)
+        if m and date(int(m.group(2)), int(m.group(3)), 1) < month_start(before):
+            months.append(date(int(m.group(2)), int(m.group(3)), 1))
+
+    for month in months:
+        with get_cursor(commit=True) as cur:
+            # Items first, dropped while still attached: a detached items partition keeps
+            # its foreign key to orders and would stop the orders partition from leaving.
+            items, orders = (partition_name(table, month) for table in reversed(TABLES))
+            _dump(cur, items, os.path.join(directory, f"{items}.csv.gz"))
+            cur.execute(f"DROP TABLE {items}")
+            _dump(cur, orders, os.path.join(directory, f"{orders}.csv.gz"))
+            cur.execute(f"ALTER TABLE orders DETACH PARTITION {orders}")
+            cur.execute(f"DROP TABLE {orders}")
+        print(f"[Partitions] Archived {month:%Y-%m} to {directory}/")
+    return months
+
+def restore(path: str):
+    """Re-attach an archived month from its orders_*.csv.gz (the matching order_items file is loaded too)."""
+    directory, filename = os.path.split(path)
+    m = PARTITION_RE.match(filename.replace('.csv.gz', ''))
+    if not m:
+        raise ValueError(f"Not an archived partition: {path}")
+    month = date(int(m.group(2)), int(m.group(3)), 1)
+    with get_cursor(commit=True) as cur:
+        for table in TABLES:
+            name = partition_name(table, month)
+            cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            with gzip.open(os.path.join(directory, f"{name}.csv.gz"), 'rb') as f:
+                cur.copy_expert(f"COPY {name} FROM STDIN WITH (FORMAT csv, HEADER)", f)
+            cur.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                (month, add_months(month, 1)),
+            )
+    print(f"[Partitions] ✅ Restored {month:%Y-%m}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('ensure')
+    p.add_argument('--months-ahead', type=int, default=3)
+    p = sub.add_parser('migrate')
+    p.add_argument('--batch-size', type=int, default=5000)
+    p = sub.add_parser('archive')
+    p.add_argument('--before', required=True, help='YYYY-MM; months strictly before it are archived')
+    p.add_argument('--dir', default='archive')
+    p = sub.add_parser('restore')
+    p.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'ensure':
+        ensure_partitions(args.months_ahead)
+    elif args.command == 'migrate':
+        migrate(args.batch_size)
+    elif args.command == 'archive':
+        year, month = args.before.split('-')
+        archive(date(int(year), int(month), 1), args.dir)
+    elif args.command == 'restore':
+        restore(args.path)
+
+if __name__ == "__main__":
+    main()
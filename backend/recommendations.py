@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+"Frequently bought together" recommendations, computed offline.
+Run: python recommendations.py [--full] [--top-k 8] [--chunk-size 50000] [--min-lift 1.0]
+Reads order_items in streamed chunks (only orders since the last run unless --full),
+accumulates a sparse product co-occurrence matrix and stores lift-ranked top-K
+neighbours per product in product_recommendations.
+"""
+import argparse
+import io
+import time
+import numpy as np
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+from scipy import sparse
+from dotenv import load_dotenv
+load_dotenv()
+
+from db import get_connection, get_cursor
+
+TOP_K = 8
+MIN_PAIR_ORDERS = 2
+MIN_LIFT = 1.0  # lift <= 1: bought together no more often than chance
+# Orders younger than this may still be committing with a lower id; pick them up next run.
+SETTLE_INTERVAL = "5 minutes"
+
+def cooccurrence(order_ids, product_ids, n_products: int):
+    """Product x product matrix of how many orders contain both (diagonal: orders per product)."""
+    orders, rows = np.unique(order_ids, return_inverse=True)
+    basket = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, product_ids)),
+        shape=(len(orders), n_products),
+    )
+    basket.data[:] = 1  # one product bought in several sizes counts once per order
+    return (basket.T @ basket).tocsr(), len(orders)
+
+def top_k_lift(matrix, n_orders: int, k=TOP_K, min_pairs=MIN_PAIR_ORDERS, min_lift=MIN_LIFT):
+    """Return (product, neighbour, lift, rank) arrays of the k best neighbours of every product.
+    Pairs with lift <= min_lift are dropped, so a product may get fewer than k or none."""
+    coo = sparse.triu(matrix, k=1).tocoo()
+    keep = coo.data >= min_pairs
+    a, b, both = coo.row[keep], coo.col[keep], coo.data[keep].astype(np.float64)
+    support = matrix.diagonal().astype(np.float64)
+    lift = both * n_orders / (support[a] * support[b])
+    keep = lift > min_lift
+    a, b, lift = a[keep], b[keep], lift[keep]
+
+    # Each pair recommends in both directions.
+    src = np.concatenate([a, b])
+    dst = np.concatenate([b, a])
+    lift = np.concatenate([lift, lift])
+
+    order = np.lexsort((-lift, src))
+    src, dst, lift = src[order], dst[order], lift[order]
+    starts = np.flatnonzero(np.r_[True, src[1:] != src[:-1]])
+    rank = np.arange(len(src)) - np.repeat(starts, np.diff(np.r_[starts, len(src)]))
+    keep = rank < k
+    return src[keep], dst[keep], lift[keep], rank[keep]
+
+def _stream_chunks(conn, last_order_id: int, chunk_size: int):
+    """Yield (order_ids, product_ids) arrays; an order never straddles two chunks."""
+    cur = conn.cursor(name='recommendation_items', cursor_factory=psycopg2.extensions.cursor)
+    cur.itersize = chunk_size
+    cur.execute(
+        f"""SELECT i.order_id, i.product_id FROM order_items i JOIN orders o ON o.id = i.order_id
+            WHERE i.order_id > %s AND i.product_id IS NOT NULL AND o.status <> 'cancelled'
+              AND o.created_at < LOCALTIMESTAMP - INTERVAL '{SETTLE_INTERVAL}'
+            ORDER BY i.order_id""",
+        (last_order_id,),
+    )
+    carry = np.empty((0, 2), dtype=np.int64)
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunk = np.concatenate([carry, np.array(rows, dtype=np.int64)])
+        tail = chunk[:, 0] == chunk[-1, 0]
+        carry = chunk[tail]
+        if (~tail).any():
+            yield chunk[~tail, 0], chunk[~tail, 1]
+    if len(carry):
+        yield carry[:, 0], carry[:, 1]
+    cur.close()
+
+def _load_state(cur, n_products: int, full: bool):
+    cur.execute("SELECT last_order_id, order_count, cooccurrence FROM recommendation_state WHERE id = 1")
+    row = cur.fetchone()
+    if full or not row:
+        return 0, 0, sparse.csr_matrix((n_products, n_products), dtype=np.int64)
+    matrix = sparse.load_npz(io.BytesIO(bytes(row['cooccurrence']))).tocsr()
+    size = max(n_products, matrix.shape[0])
+    matrix.resize((size, size))
+    return row['last_order_id'], row['order_count'], matrix
+
+def run(full=False, k=TOP_K, chunk_size=50000, min_lift=MIN_LIFT):
+    """Fold orders since the last run into the stored matrix and rewrite the top-K table."""
+    t0 = time.perf_counter()
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT COALESCE(MAX(id), 0) + 1 AS n FROM products")
+        n_products = cur.fetchone()['n']
+        last_order_id, n_orders, matrix = _load_state(cur, n_products, full)
+    n_products = matrix.shape[0]
+
+    conn = get_connection()
+    try:
+        for order_ids, product_ids in _stream_chunks(conn, last_order_id, chunk_size):
+            chunk_matrix, chunk_orders = cooccurrence(order_ids, product_ids, n_products)
+            matrix = matrix + chunk_matrix
+            n_orders += chunk_orders
+            last_order_id = max(last_order_id, int(order_ids.max()))
+    finally:
+        conn.close()
+
+    src, dst, lift, rank = top_k_lift(matrix, n_orders, k, min_lift=min_lift) if n_orders else ([], [], [], [])
+    state = io.BytesIO()
+    sparse.save_npz(state, matrix.astype(np.int64))
+    with get_cursor(commit=True) as cur:
+        cur.execute("DELETE FROM product_recommendations")
+        execute_values(
+            cur,
+            "INSERT INTO product_recommendations (product_id, rank, recommended_id, lift) VALUES %s",
+            list(zip(np.asarray(src).tolist(), np.asarray(rank).tolist(), np.asarray(dst).tolist(), np.asarray(lift).tolist())),
+            page_size=5000,
+        )
+        cur.execute(
+            """INSERT INTO recommendation_state (id, last_order_id, order_count, cooccurrence, updated_at)
+               VALUES (1, %s, %s, %s, CURRENT_TIMESTAMP)
+               ON CONFLICT (id) DO UPDATE SET last_order_id = EXCLUDED.last_order_id, order_count = EXCLUDED.order_count,
+                   cooccurrence = EXCLUDED.cooccurrence, updated_at = CURRENT_TIMESTAMP""",
+            (last_order_id, n_orders, psycopg2.Binary(state.getvalue())),
+        )
+    print(f"[Recommendations] ✅ {n_orders} orders, {len(src)} links, {time.perf_counter() - t0:.1f}s")
+    return len(src)
+
+def for_product(product_id: int, limit=4):
+    """Precomputed neighbours of a product: one lookup on the (product_id, rank) primary key."""
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT p.id, p.name_fr, p.name_ar, p.price, p.image_url
+                       FROM product_recommendations r JOIN products p ON p.id = r.recommended_id
+                       WHERE r.product_id = %s AND r.rank < %s AND p.is_active = TRUE
+                       ORDER BY r.rank""", (product_id, limit))
+        return cur.fetchall()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full', action='store_true', help='rebuild from every order instead of the new ones')
+    parser.add_argument('--top-k', type=int, default=TOP_K)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--min-lift', type=float, default=MIN_LIFT, help='keep only pairs with a higher lift')
+    args = parser.parse_args()
+    run(full=args.full, k=args.top_k, chunk_size=args.chunk_size, min_lift=args.min_lift)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Baridi Mob / CCP statement reconciliation.
+The uploaded CSV is streamed with COPY into a temp table and matched against pending
+orders in set-based joins; matched orders are marked paid in one UPDATE.
+"""
+import csv
+import re
+import unicodedata
+import psycopg2
+from db import get_cursor
+
+# Normalised header -> statement column. Exports differ between Baridi Mob and CCP.
+HEADER_ALIASES = {
+    'reference': 'reference', 'ref': 'reference', 'n transaction': 'reference', 'transaction': 'reference',
+    'numero de transaction': 'reference', 'id transaction': 'reference',
+    'montant': 'amount', 'amount': 'amount', 'credit': 'amount', 'montant da': 'amount',
+    'telephone': 'phone', 'phone': 'phone', 'tel': 'phone', 'mobile': 'phone', 'numero': 'phone',
+    'emetteur': 'phone', 'date': 'paid_at', 'date operation': 'paid_at',
+}
+REQUIRED = ('reference', 'amount', 'phone')
+MAX_REFERENCE_DISTANCE = 2
+MAX_PHONE_DISTANCE = 1
+
+def _header_key(name: str) -> str:
+    """'N° Transaction' -> 'n transaction', 'Montant (DA)' -> 'montant da'."""
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', name.lower()).split())
+
+def _columns(header_line: str):
+    """Return (delimiter, raw column count, {statement column: raw index})."""
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    names = next(csv.reader([header_line], delimiter=delimiter))
+    keys = [_header_key(name) for name in names]
+    mapping = {}
+    # Exact aliases first; a header's first word ('Montant versé') only fills columns
+    # still unmapped, so 'Numéro de compte' cannot take the place of 'Téléphone'.
+    for i, key in enumerate(keys):
+        column = HEADER_ALIASES.get(key)
+        if column and column not in mapping:
+            mapping[column] = i
+    for i, key in enumerate(keys):
+        column = HEADER_ALIASES.get(key.split(' ')[0]) if key else None
+        if column and column not in mapping and i not in mapping.values():
+            mapping[column] = i
+    return delimiter, len(names), mapping
+
+def _fuzzy_available(cur) -> bool:
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'fuzzystrmatch'")
+    return cur.fetchone() is not None
+
+def reconcile(stream, filename: str = ''):
+    """Reconcile one statement file (binary stream). Returns (summary_dict, error)."""
+    header = stream.readline().decode('utf-8-sig', errors='replace').strip()
+    if not header:
+        return None, 'Fichier vide'
+    delimiter, width, mapping = _columns(header)
+    missing = [c for c in REQUIRED if c not in mapping]
+    if missing:
+        return None, f"Colonnes manquantes: {', '.join(missing)}"
+
+    raw = [f"c{i}" for i in range(width)]
+    col = {k: f"c{i}" for k, i in mapping.items()}
+    paid_at = col.get('paid_at', 'NULL')
+
+    with get_cursor(commit=True) as cur:
+        cur.execute(f"CREATE TEMP TABLE statement_raw ({', '.join(c + ' TEXT' for c in raw)}) ON COMMIT DROP")
+        try:
+            cur.copy_expert(
+                f"COPY statement_raw FROM STDIN WITH (FORMAT csv, DELIMITER '{delimiter}', ENCODING 'UTF8')",
+                stream,
+            )
+        except psycopg2.DataError as e:
+            cur.connection.rollback()
+            return None, f"Relevé illisible: {(e.pgerror or str(e)).splitlines()[0]}"
+
+        # Normalise once: references without spaces in upper case, amounts as numeric,
+        # phones as their last 9 digits. In amounts a final ',' or '.' followed by one or
+        # two digits is the decimal separator and every other one groups thousands, so
+        # "1 234,50", "1.234,50" and "1,234.50" are all 1234.50 and "1.234" is 1234.
+        cur.execute(f"""
+            CREATE TEMP TABLE statement ON COMMIT DROP AS
+            SELECT line_no, reference, amount, phone, paid_at,
+                   NULL::INTEGER AS order_id, NULL::TIMESTAMP AS order_created_at, NULL::VARCHAR(20) AS match_type
+            FROM (
+                SELECT row_number() OVER () + 1 AS line_no,
+                       upper(regexp_replace({col['reference']}, '\\s', '', 'g')) AS reference,
+                       CASE WHEN a ~ '^-?[0-9]{{1,8}}(\\.[0-9]+)?$' THEN a::NUMERIC(10, 2) END AS amount,
+                       right(regexp_replace({col['phone']}, '\\D', '', 'g'), 9) AS phone,
+                       {paid_at} AS paid_at
+                FROM (
+                    SELECT *, CASE WHEN s ~ '[.,][0-9]{{1,2}}$'
+                                   THEN regexp_replace(substring(s from '^(.*)[.,][0-9]{{1,2}}$'), '[.,]', '', 'g')
+                                        || '.' || substring(s from '[.,]([0-9]{{1,2}})$')
+                                   ELSE regexp_replace(s, '[.,]', '', 'g') END AS a
+                    FROM (SELECT *, regexp_replace({col['amount']}, '[^0-9,.-]', '', 'g') AS s FROM statement_raw) r
+                ) r
+            ) s
+        """)
+
+        cur.execute("""UPDATE statement SET match_type = 'invalid'
+                       WHERE reference IS NULL OR reference = '' OR amount IS NULL OR amount <= 0""")
+
+        # The same reference twice in this file, or already used to pay an earlier order
+        # (looked up through the unique index on matched references).
+        cur.execute("""UPDATE statement s SET match_type = 'duplicate'
+                       FROM (SELECT reference FROM statement WHERE match_type IS NULL
+                             GROUP BY reference HAVING COUNT(*) > 1) d
+                       WHERE s.reference = d.reference AND s.match_type IS NULL""")
+        cur.execute("""UPDATE statement s SET match_type = 'reused'
+                       FROM payment_statement_lines p
+                       WHERE p.reference = s.reference AND p.order_id IS NOT NULL AND s.match_type IS NULL""")
+
+        cur.execute("""
+            CREATE TEMP TABLE pending ON COMMIT DROP AS
+            SELECT id, created_at, total,
+                   upper(regexp_replace(COALESCE(baridi_reference, ''), '\\s', '', 'g')) AS reference,
+                   right(regexp_replace(COALESCE(baridi_phone, ''), '\\D', '', 'g'), 9) AS phone
+            FROM orders WHERE status = 'pending'
+        """)
+        cur.execute("ANALYZE statement")
+        cur.execute("ANALYZE pending")
+
+        # Exact match: one hash join on (reference, amount, phone). If a customer placed the
+        # same order twice, the line pays the oldest one.
+        cur.execute("""UPDATE statement s SET order_id = m.id, order_created_at = m.created_at, match_type = 'exact'
+                       FROM (SELECT DISTINCT ON (s.line_no) s.line_no, o.id, o.created_at
+                             FROM statement s JOIN pending o
+                               ON o.reference = s.reference AND o.total = s.amount AND o.phone = s.phone
+                             WHERE s.match_type IS NULL
+                             ORDER BY s.line_no, o.created_at) m
+                       WHERE s.line_no = m.line_no""")
+
+        # Fuzzy fallback for typos: same amount, and either the same phone with a reference
+        # at most 2 edits away or the same reference with a phone at most 1 edit away.
+        # Each line and each order is matched at most once, closest first.
+        if _fuzzy_available(cur):
+            cur.execute("""
+                UPDATE statement s SET order_id = m.id, order_created_at = m.created_at, match_type = 'fuzzy'
+                FROM (
+                    SELECT DISTINCT ON (c.id) c.id, c.created_at, c.line_no
+                    FROM (
+                        SELECT DISTINCT ON (s.line_no) s.line_no, o.id, o.created_at,
+                               levenshtein(o.reference, s.reference) + levenshtein(o.phone, s.phone) AS distance
+                        FROM statement s JOIN pending o ON o.total = s.amount
+                        WHERE s.match_type IS NULL
+                          AND o.id NOT IN (SELECT order_id FROM statement WHERE order_id IS NOT NULL)
+                          AND ((o.phone = s.phone AND levenshtein(o.reference, s.reference) <= %s)
+                               OR (o.reference = s.reference AND levenshtein(o.phone, s.phone) <= %s))
+                        ORDER BY s.line_no, distance
+                    ) c
+                    ORDER BY c.id, c.distance, c.line_no
+                ) m
+                WHERE s.line_no = m.line_no
+            """, (MAX_REFERENCE_DISTANCE, MAX_PHONE_DISTANCE))
+
+        cur.execute("UPDATE statement SET match_type = 'unmatched' WHERE match_type IS NULL")
+
+        cur.execute("""UPDATE orders o SET status = 'paid'
+                       FROM statement s
+                       WHERE o.id = s.order_id AND o.created_at = s.order_created_at AND o.status = 'pending'""")
+        paid = cur.rowcount
+
+        cur.execute("""INSERT INTO payment_statement_lines (filename, line_no, reference, amount, phone, paid_at, order_id, match_type)
+                       SELECT %s, line_no, reference, amount, phone, paid_at, order_id, match_type FROM statement
+                       ON CONFLICT (reference) WHERE order_id IS NOT NULL DO NOTHING""", (filename[:255],))
+
+        cur.execute("SELECT match_type, COUNT(*) AS n FROM statement GROUP BY match_type")
+        counts = {r['match_type']: r['n'] for r in cur.fetchall()}
+        cur.execute("""SELECT s.line_no, s.reference, s.amount, s.phone, s.match_type, o.order_number
+                       FROM statement s LEFT JOIN orders o ON o.id = s.order_id AND o.created_at = s.order_created_at
+                       WHERE s.match_type <> 'exact' ORDER BY s.line_no LIMIT 500""")
+        review = cur.fetchall()
+
+    print(f"[Reconciliation] ✅ {sum(counts.values())} lines, {paid} orders paid")
+    return {'lines': sum(counts.values()), 'paid': paid, 'counts': counts, 'review': review}, None
@@ -0,0 +1,166 @@
+"""
+Background job scheduler.
+Jobs register with an interval and run in a bounded thread pool. Every web worker runs
+the scheduler; a Postgres advisory lock plus the shared next_run_at in scheduled_jobs
+make each run happen on exactly one node. Runs are recorded in job_runs.
+"""
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.extras import execute_values
+from db import get_connection, get_cursor
+from config import Config
+
+LOCK_NAMESPACE = 0x647A  # first key of pg_try_advisory_lock(int, int); the job name is the second
+NODE = f"{socket.gethostname()}:{os.getpid()}"
+
+_jobs = {}
+_running = set()
+_running_lock = threading.Lock()
+_executor = None
+_thread = None
+
+def register(name: str, interval: int, func):
+    """Run func() every `interval` seconds, on one node at a time."""
+    _jobs[name] = {'name': name, 'interval': int(interval), 'func': func, 'next_check': 0.0}
+
+def _sync_jobs():
+    with get_cursor(commit=True) as cur:
+        execute_values(
+            cur,
+            """INSERT INTO scheduled_jobs (name, interval_seconds) VALUES %s
+               ON CONFLICT (name) DO UPDATE SET interval_seconds = EXCLUDED.interval_seconds""",
+            [(j['name'], j['interval']) for j in _jobs.values()],
+        )
+
+def run_job(job):
+    """Run one job if it is due and no other node holds its lock. Returns the run status or None."""
+    conn = get_connection()
+    conn.autocommit = True  # the lock is held by the session, not a long open transaction
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s)) AS ok", (LOCK_NAMESPACE, job['name']))
+        if not cur.fetchone()['ok']:
+            return None
+        try:
+            # Holding the lock means no node is running this job: a 'running' row left
+            # behind is from a worker that died mid-run.
+            cur.execute("""UPDATE job_runs SET status = 'abandoned', finished_at = CURRENT_TIMESTAMP
+                           WHERE job_name = %s AND status = 'running'""", (job['name'],))
+            if cur.rowcount:
+                print(f"[Scheduler] ⚠️ {job['name']}: {cur.rowcount} interrupted run(s) marked abandoned")
+            cur.execute("UPDATE scheduled_jobs SET running_on = NULL WHERE name = %s AND running_on IS NOT NULL",
+                        (job['name'],))
+            # Interval counts from the start of a run, whichever node made it.
+            cur.execute("""UPDATE scheduled_jobs
+                           SET next_run_at = CURRENT_TIMESTAMP + interval_seconds * INTERVAL '1 second',
+                               last_started_at = CURRENT_TIMESTAMP, running_on = %s
+                           WHERE name = %s AND next_run_at <= CURRENT_TIMESTAMP RETURNING name""",
+                        (NODE, job['name']))
+            if not cur.fetchone():
+                return None
+            cur.execute("INSERT INTO job_runs (job_name, node) VALUES (%s, %s) RETURNING id", (job['name'], NODE))
+            run_id = cur.fetchone()['id']
+
+            status, error = 'ok', None
+            t0 = time.perf_counter()
+            try:
+                job['func']()
+            except Exception as e:
+                status, error = 'failed', str(e)[:2000]
+                print(f"[Scheduler] ❌ {job['name']} failed: {error}")
+            duration_ms = int((time.perf_counter() - t0) * 1000)
+
+            cur.execute("""UPDATE job_runs SET finished_at = CURRENT_TIMESTAMP, duration_ms = %s, status = %s, error = %s
+                           WHERE id = %s""", (duration_ms, status, error, run_id))
+            cur.execute("""UPDATE scheduled_jobs
+                           SET last_finished_at = CURRENT_TIMESTAMP, last_duration_ms = %s, last_status = %s,
+                               last_error = %s, running_on = NULL, run_count = run_count + 1,
+                               failure_count = failure_count + %s
+                           WHERE name = %s""",
+                        (duration_ms, status, error, int(status == 'failed'), job['name']))
+            return status
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s))", (LOCK_NAMESPACE, job['name']))
+    finally:
+        conn.close()
+
+def _run_tracked(job):
+    try:
+        run_job(job)
+    except Exception as e:
+        print(f"[Scheduler] ❌ {job['name']}: {str(e)}")
+    finally:
+        with _running_lock:
+            _running.discard(job['name'])
+
+def _loop(tick):
+    # Jobs need their scheduled_jobs rows; keep retrying if the database is down at boot.
+    while True:
+        try:
+            _sync_jobs()
+            break
+        except Exception as e:
+            print(f"[Scheduler] ❌ Could not register jobs: {str(e)}")
+            time.sleep(Config.SCHEDULER_CHECK_SECONDS)
+    while True:
+        now = time.monotonic()
+        for job in list(_jobs.values()):
+            if now < job['next_check']:
+                continue
+            with _running_lock:
+                if job['name'] in _running:
+                    continue
+                _running.add(job['name'])
+            # Each node checks once per interval; the database decides whether the run is due.
+            job['next_check'] = now + min(job['interval'], Config.SCHEDULER_CHECK_SECONDS)
+            _executor.submit(_run_tracked, job)
+        time.sleep(tick)
+
+def start(max_workers=None, tick=1.0):
+    """Start the scheduler thread and its worker pool (once per process)."""
+    global _executor, _thread
+    if _thread is not None or not Config.SCHEDULER_ENABLED or not _jobs:
+        return _thread
+    _executor = ThreadPoolExecutor(max_workers=max_workers or Config.SCHEDULER_WORKERS, thread_name_prefix='scheduler-job')
+    _thread = threading.Thread(target=_loop, args=(tick,), name='scheduler', daemon=True)
+    _thread.start()
+    print(f"[Scheduler] Started {len(_jobs)} jobs on {NODE}")
+    return _thread
+
+def run_now(name: str) -> bool:
+    """Make a job due immediately; the next node to check it runs it."""
+    with get_cursor(commit=True) as cur:
+        cur.execute("UPDATE scheduled_jobs SET next_run_at = CURRENT_TIMESTAMP WHERE name = %s RETURNING name", (name,))
+        found = cur.fetchone() is not None
+    if name in _jobs:
+        _jobs[name]['next_check'] = 0.0
+    return found
+
+def job_status():
+    with get_cursor(commit=False) as cur:
+        cur.execute("SELECT * FROM scheduled_jobs ORDER BY name")
+        return cur.fetchall()
+
+def recent_runs(limit=50):
+    with get_cursor(commit=False) as cur:
+        cur.execute("""SELECT id, job_name, node, started_at, finished_at, duration_ms, status, error
+                       FROM job_runs ORDER BY started_at DESC LIMIT %s""", (limit,))
+        return cur.fetchall()
+
+def prune_runs(days=None, batch_size=1000):
+    """Delete job history older than JOB_HISTORY_DAYS, in batches."""
+    days = days or Config.JOB_HISTORY_DAYS
+    deleted = 0
+    while True:
+        with get_cursor(commit=True) as cur:
+            cur.execute("""DELETE FROM job_runs WHERE id IN (
+                               SELECT id FROM job_runs WHERE started_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+                               ORDER BY id LIMIT %s
+                           )""", (days, batch_size))
+            n = cur.rowcount
+        deleted += n
+        if n < batch_size:
+            return deleted
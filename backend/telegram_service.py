@@ -39,6 +39,9 @@ def send_telegram_notification(message: str) -> bool:
         print(f"[Telegram] ❌ Error: {str(e)}")
         return False
 
+def items_summary(items) -> str:
+    return '\n'.join(f"- {r['name_fr']} x{r['quantity']} = {float(r['price'])*r['quantity']:.2f} DA" for r in items)
+
 def notify_new_order(order_number: str, total: float, email: str, items_summary: str):
     msg = (
         f"🛒 <b>Nouvelle commande DZ Clothes</b>\n"
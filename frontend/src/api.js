@@ -59,6 +59,17 @@ export async function verifyEmail(token) {
   return json
 }
 
+export async function resendVerification(email, lang) {
+  const res = await fetch(`${API}/auth/resend-verification`, {
+    method: 'POST',
+    headers: getHeaders(false),
+    body: JSON.stringify({ email, lang }),
+  })
+  const json = await res.json().catch(() => ({}))
+  if (!res.ok) throw new Error(json.error || 'Erreur')
+  return json
+}
+
 export async function me() {
   const res = await fetch(`${API}/auth/me`, { headers: getHeaders() })
   if (res.status === 401) return null
@@ -73,10 +84,16 @@ export async function getProducts(params = {}) {
   return Array.isArray(json) ? json : []
 }
 
+// The product document is cached; its stock is fetched live alongside it.
 export async function getProduct(id) {
-  const res = await fetch(`${API}/products/${id}?lang=${localStorage.getItem('dz_lang') || 'fr'}`)
+  const [res, stockRes] = await Promise.all([
+    fetch(`${API}/products/${id}?lang=${localStorage.getItem('dz_lang') || 'fr'}`),
+    fetch(`${API}/products/${id}/stock`),
+  ])
   if (!res.ok) return null
-  return res.json()
+  const product = await res.json()
+  const { stock } = stockRes.ok ? await stockRes.json() : {}
+  return { ...product, stock }
 }
 
 export async function getCart() {
@@ -131,6 +148,44 @@ export async function validateDiscount(code, subtotal) {
   return json
 }
 
+export async function startCheckout() {
+  const res = await fetch(`${API}/checkout/start`, { method: 'POST', headers: getHeaders() })
+  const json = await res.json().catch(() => ({}))
+  if (!res.ok) throw new Error(json.error || 'Erreur')
+  return json
+}
+
+// Several GET calls in one round trip: batch(['/api/auth/me', '/api/cart?lang=fr'])
+export async function batch(paths) {
+  const res = await fetch(`${API}/batch`, {
+    method: 'POST',
+    headers: getHeaders(),
+    body: JSON.stringify({ requests: paths }),
+  })
+  const json = await res.json().catch(() => ({}))
+  if (!res.ok) throw new Error(json.error || 'Erreur')
+  return json.responses.map((r) => (r.status < 400 ? r.body : null))
+}
+
+// First page load: the user and the cart in one round trip, shared by AuthProvider and CartProvider.
+let initialSession = null
+export function loadSession() {
+  if (!initialSession) {
+    ensureCartSession()
+    const lang = localStorage.getItem('dz_lang') || 'fr'
+    initialSession = batch(['/api/auth/me', `/api/cart?lang=${lang}`]).then(([me, cart]) => ({
+      user: me?.user || null,
+      cart: Array.isArray(cart) ? cart : [],
+    }))
+  }
+  return initialSession
+}
+
+// After login or logout the batched first load no longer describes the session.
+export function resetSession() {
+  initialSession = null
+}
+
 export async function checkout(payload) {
   const res = await fetch(`${API}/checkout`, {
     method: 'POST',
@@ -155,6 +210,14 @@ export async function adminOrders() {
   return res.json()
 }
 
+// Live order events (Server-Sent Events); EventSource cannot send headers, so the JWT goes in the query string.
+export function adminOrderEvents(onEvent) {
+  const token = localStorage.getItem('dz_token')
+  const source = new EventSource(`${API}/admin/orders/stream?jwt=${encodeURIComponent(token || '')}`)
+  source.addEventListener('order', (e) => onEvent(JSON.parse(e.data)))
+  return () => source.close()
+}
+
 export async function adminOrderDetail(id) {
   const res = await fetch(`${API}/admin/orders/${id}`, { headers: getHeaders() })
   if (!res.ok) throw new Error('Non autorisé')
@@ -8,8 +8,8 @@ export function AuthProvider({ children }) {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    api.me().then((u) => {
-      setUser(u)
+    api.loadSession().then((s) => {
+      setUser(s.user)
       setLoading(false)
     }).catch(() => setLoading(false))
   }, [])
@@ -17,6 +17,7 @@ export function AuthProvider({ children }) {
   const login = async (email, password) => {
     const data = await api.login(email, password)
     localStorage.setItem('dz_token', data.access_token)
+    api.resetSession()
     setUser(data.user)
     return data
   }
@@ -24,12 +25,14 @@ export function AuthProvider({ children }) {
   const loginGoogle = async (credential) => {
     const data = await api.loginGoogle(credential)
     localStorage.setItem('dz_token', data.access_token)
+    api.resetSession()
     setUser(data.user)
     return data
   }
 
   const logout = () => {
     localStorage.removeItem('dz_token')
+    api.resetSession()
     setUser(null)
   }
 
@@ -13,7 +13,13 @@ export function CartProvider({ children }) {
   }, [])
 
   useEffect(() => {
-    refresh()
+    setLoading(true)
+    api.loadSession()
+      .then((s) => {
+        setItems(s.cart)
+        setLoading(false)
+      })
+      .catch(refresh)
   }, [refresh])
 
   const addToCart = async (productId, quantity = 1, optionSize = '', optionColor = '') => {
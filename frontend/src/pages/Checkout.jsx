@@ -30,9 +30,14 @@ export default function Checkout() {
     if (user?.email) setForm((f) => ({ ...f, email: user.email }))
   }, [user])
 
+  // The cart loaded with the page may be a guest cart the user has since logged in over.
   useEffect(() => {
     refresh()
-  }, [refresh])
+  }, [refresh, user])
+
+  useEffect(() => {
+    if (user) api.startCheckout().catch((err) => setError(err.message))
+  }, [user])
 
   const handleApplyDiscount = () => {
     if (!form.discount_code.trim()) return
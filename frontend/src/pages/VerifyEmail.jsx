@@ -5,10 +5,12 @@ import * as api from '../api'
 import './Auth.css'
 
 export default function VerifyEmail() {
-  const { t } = useTranslation()
+  const { t, i18n } = useTranslation()
   const [searchParams] = useSearchParams()
   const token = searchParams.get('token')
   const [status, setStatus] = useState('loading') // loading | ok | error
+  const [email, setEmail] = useState('')
+  const [resent, setResent] = useState('')
 
   useEffect(() => {
     if (!token) {
@@ -18,6 +20,13 @@ export default function VerifyEmail() {
     api.verifyEmail(token).then(() => setStatus('ok')).catch(() => setStatus('error'))
   }, [token])
 
+  const handleResend = (e) => {
+    e.preventDefault()
+    api.resendVerification(email, i18n.language)
+      .then((res) => setResent(res.message))
+      .catch((err) => setResent(err.message))
+  }
+
   return (
     <div className="auth-page">
       <div className="auth-card">
@@ -32,6 +41,17 @@ export default function VerifyEmail() {
         {status === 'error' && (
           <>
             <p className="error-msg">Lien invalide ou expiré.</p>
+            {resent ? (
+              <p className="success-msg">{resent}</p>
+            ) : (
+              <form onSubmit={handleResend}>
+                <div className="form-group">
+                  <label>{t('email')}</label>
+                  <input type="email" value={email} onChange={(e) => setEmail(e.target.value)} required />
+                </div>
+                <button type="submit" className="btn btn-primary">Renvoyer le lien</button>
+              </form>
+            )}
             <Link to="/register" className="btn btn-ghost">{t('register')}</Link>
           </>
         )}
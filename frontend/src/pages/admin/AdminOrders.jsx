@@ -13,6 +13,15 @@ export default function AdminOrders() {
     api.adminOrders().then(setOrders).catch((e) => setError(e.message))
   }, [])
 
+  useEffect(() => api.adminOrderEvents((event) => {
+    setOrders((prev) => {
+      if (prev.some((o) => o.id === event.id)) {
+        return prev.map((o) => (o.id === event.id ? { ...o, status: event.status } : o))
+      }
+      return [event, ...prev]
+    })
+  }), [])
+
   const updateStatus = (id, status) => {
     setUpdating(id)
     api.adminUpdateOrderStatus(id, status).then(() => {